@@ -0,0 +1,155 @@
+"""
+Circuit breaker for slow or failing upstream APIs
+After CIRCUIT_FAILURE_THRESHOLD consecutive timeouts/connection errors the
+circuit opens and calls fail immediately (callers serve cached or fallback
+data) instead of each waiting for its own timeout. After
+CIRCUIT_RECOVERY_SECONDS a single half-open probe is let through; success
+closes the circuit, failure opens it again
+"""
+
+import os
+import time
+import threading
+from collections import deque
+
+import requests
+
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', 3))
+CIRCUIT_RECOVERY_SECONDS = float(os.getenv('CIRCUIT_RECOVERY_SECONDS', 30))
+# Number of recent call latencies kept for the percentiles
+LATENCY_WINDOW = 500
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the upstream while the circuit is open."""
+
+
+def _percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class CircuitBreaker:
+    """
+    Per-process circuit breaker around calls to one upstream service.
+
+    Only the exception types in failure_exceptions count as failures (by
+    default every exception); other outcomes close the circuit again.
+    """
+
+    def __init__(self, name, failure_exceptions=(Exception,), failure_threshold=None, recovery_seconds=None):
+        self.name = name
+        self.failure_exceptions = failure_exceptions
+        self.failure_threshold = failure_threshold if failure_threshold is not None else CIRCUIT_FAILURE_THRESHOLD
+        self.recovery_seconds = recovery_seconds if recovery_seconds is not None else CIRCUIT_RECOVERY_SECONDS
+
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+        self._latencies_ms = deque(maxlen=LATENCY_WINDOW)
+        self.stats = {'calls': 0, 'successes': 0, 'failures': 0, 'rejected': 0, 'opened': 0, 'probes': 0}
+
+    def _allow(self):
+        """Whether a call may go through now (and whether it is the half-open probe)."""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.recovery_seconds:
+                self.state = HALF_OPEN
+            if self.state == CLOSED:
+                return True, False
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                self.stats['probes'] += 1
+                return True, True
+            self.stats['rejected'] += 1
+            return False, False
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Call fn(*args, **kwargs) through the breaker.
+
+        Raises:
+            CircuitOpenError: If the circuit is open (fn is not called)
+        """
+        allowed, probe = self._allow()
+        if not allowed:
+            raise CircuitOpenError(f"{self.name} circuit is open")
+
+        started = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except self.failure_exceptions:
+            self._record(started, failed=True, probe=probe)
+            raise
+        except BaseException:
+            self._record(started, failed=False, probe=probe)
+            raise
+        self._record(started, failed=False, probe=probe)
+        return result
+
+    def _record(self, started, failed, probe):
+        latency_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._latencies_ms.append(latency_ms)
+            self.stats['calls'] += 1
+            if probe:
+                self._probe_in_flight = False
+
+            if not failed:
+                self.stats['successes'] += 1
+                self.consecutive_failures = 0
+                if self.state != CLOSED:
+                    print(f"[circuit] {self.name} closed (recovered)")
+                self.state = CLOSED
+                return
+
+            self.stats['failures'] += 1
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.stats['opened'] += 1
+                    print(f"[circuit] {self.name} opened after {self.consecutive_failures} failures")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def get_stats(self):
+        """State, counters and latency percentiles (ms) of recent calls."""
+        with self._lock:
+            latencies = sorted(self._latencies_ms)
+            stats = dict(self.stats)
+            stats.update({
+                'name': self.name,
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'failure_threshold': self.failure_threshold,
+                'recovery_seconds': self.recovery_seconds,
+                'open_for_seconds': round(time.monotonic() - self.opened_at, 1) if self.state != CLOSED else None,
+            })
+        stats['latency_ms'] = {
+            'samples': len(latencies),
+            'p50': _round(_percentile(latencies, 0.50)),
+            'p90': _round(_percentile(latencies, 0.90)),
+            'p99': _round(_percentile(latencies, 0.99)),
+            'max': _round(latencies[-1] if latencies else None),
+        }
+        return stats
+
+
+def _round(value):
+    return round(value, 1) if value is not None else None
+
+
+# data.gov.in (mandi prices for crop economics and the buyer price sync):
+# only timeouts and connection errors trip it
+data_gov_in = CircuitBreaker(
+    'data.gov.in',
+    failure_exceptions=(requests.exceptions.Timeout, requests.exceptions.ConnectionError),
+)
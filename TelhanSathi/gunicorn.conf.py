@@ -0,0 +1,57 @@
+"""
+Gunicorn configuration (used by the Procfile and render.yaml)
+
+By default every worker imports the app and warms the ML stack up in the
+background, answering 503 with Retry-After until it is ready, so the server
+(and the platform health check) is up immediately.
+
+With GUNICORN_PRELOAD=1 the app, the ML stack, the dataset and all models are
+loaded once in the master before any worker is forked. Workers
+then share those pages copy-on-write instead of each loading its own
+forecaster: model and price arrays are read-only, the forecast tensor is a
+memory-mapped .npy, and gc.freeze() keeps the garbage collector from
+touching (and so copying) the preloaded objects. The trade-off: the master
+binds its port only after loading, so health checks must allow for that.
+
+Run `python memory_benchmark.py` to compare per-worker memory with and
+without preload.
+"""
+
+import gc
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+preload_app = os.getenv('GUNICORN_PRELOAD', '').lower() in ('1', 'true', 'yes')
+
+if preload_app:
+    # Read by routes/profit_simulator.py when the app is imported in the master
+    os.environ['ML_PRELOAD'] = '1'
+
+
+def when_ready(server):
+    if preload_app:
+        server.log.info("App and models preloaded in the master (pid %s)", os.getpid())
+
+
+def pre_fork(server, worker):
+    # Move everything allocated so far out of the collector's reach, so
+    # collections in the workers never write to the shared pages
+    if preload_app:
+        gc.collect()
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    if not preload_app:
+        return
+
+    from app import app
+    from extensions import db
+    from routes.profit_simulator import after_fork
+
+    # Never share database connections opened in the master
+    with app.app_context():
+        db.engine.dispose(close=False)
+    after_fork()
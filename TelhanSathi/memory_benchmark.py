@@ -0,0 +1,137 @@
+"""
+Gunicorn Worker Memory Benchmark
+Starts the app under gunicorn.conf.py with 1, 4 and 8 workers, with and
+without preload, waits until the models are ready and reports per-worker
+RSS, PSS and USS from /proc (Linux only)
+
+RSS counts shared pages in full in every worker; PSS splits them between
+the processes sharing them, so the sum of PSS is the real footprint.
+
+    python memory_benchmark.py [--workers 1,4,8] [--modes preload,fork] [--output report.json]
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import subprocess
+import urllib.request
+import urllib.error
+from datetime import datetime
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_WORKERS = (1, 4, 8)
+DEFAULT_MODES = ('preload', 'fork')
+
+
+def memory_kb(pid):
+    """RSS, PSS and USS (private pages) of a process in KB, from smaps_rollup."""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1])
+    return {
+        'rss_kb': fields.get('Rss', 0),
+        'pss_kb': fields.get('Pss', 0),
+        'uss_kb': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0),
+    }
+
+
+def child_pids(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(child) for child in f.read().split()]
+
+
+def wait_until_ready(master, port, n_workers, timeout):
+    """
+    Wait for all workers to be forked and for /profit/api/ready to answer 200
+    on enough consecutive requests to have reached every worker.
+    """
+    deadline = time.monotonic() + timeout
+    consecutive = 0
+    while time.monotonic() < deadline:
+        if master.poll() is not None:
+            raise RuntimeError(f'gunicorn exited with code {master.returncode}')
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/profit/api/ready', timeout=5) as response:
+                ready = response.status == 200
+        except (urllib.error.URLError, OSError):
+            ready = False
+        consecutive = consecutive + 1 if ready else 0
+        if consecutive >= 4 * n_workers and len(child_pids(master.pid)) >= n_workers:
+            return
+        time.sleep(0.1 if ready else 0.5)
+    raise TimeoutError(f'{n_workers} workers not ready after {timeout}s')
+
+
+def measure(n_workers, mode, port, timeout, settle_seconds):
+    """Start gunicorn, wait for readiness and sample the memory of all its processes."""
+    env = dict(os.environ, WEB_CONCURRENCY=str(n_workers), PORT=str(port),
+               GUNICORN_PRELOAD='1' if mode == 'preload' else '0')
+    env.pop('ML_PRELOAD', None)
+    started = time.perf_counter()
+    master = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+        cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_ready(master, port, n_workers, timeout)
+        ready_seconds = time.perf_counter() - started
+        time.sleep(settle_seconds)
+
+        master_memory = memory_kb(master.pid)
+        workers = [memory_kb(pid) for pid in child_pids(master.pid)]
+    finally:
+        master.send_signal(signal.SIGTERM)
+        try:
+            master.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            master.kill()
+
+    def mean(field):
+        return round(sum(worker[field] for worker in workers) / len(workers) / 1024, 1)
+
+    return {
+        'mode': mode,
+        'workers': n_workers,
+        'ready_seconds': round(ready_seconds, 2),
+        'master_rss_mb': round(master_memory['rss_kb'] / 1024, 1),
+        'worker_rss_mb': mean('rss_kb'),
+        'worker_pss_mb': mean('pss_kb'),
+        'worker_uss_mb': mean('uss_kb'),
+        'total_pss_mb': round((master_memory['pss_kb'] + sum(w['pss_kb'] for w in workers)) / 1024, 1),
+        'per_worker': workers,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Per-worker memory of the app under gunicorn')
+    parser.add_argument('--workers', default=','.join(str(n) for n in DEFAULT_WORKERS))
+    parser.add_argument('--modes', default=','.join(DEFAULT_MODES))
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--timeout', type=float, default=600)
+    parser.add_argument('--settle', type=float, default=2.0, help='Seconds to wait after readiness')
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        sys.exit('memory_benchmark.py needs Linux /proc/<pid>/smaps_rollup')
+
+    results = []
+    print(f"{'mode':<8} {'workers':>7} {'ready s':>8} {'master RSS':>11} {'worker RSS':>11} "
+          f"{'worker PSS':>11} {'worker USS':>11} {'total PSS':>10}")
+    for mode in args.modes.split(','):
+        for n_workers in [int(n) for n in args.workers.split(',')]:
+            result = measure(n_workers, mode, args.port, args.timeout, args.settle)
+            results.append(result)
+            print(f"{mode:<8} {n_workers:>7} {result['ready_seconds']:>8} {result['master_rss_mb']:>10}M "
+                  f"{result['worker_rss_mb']:>10}M {result['worker_pss_mb']:>10}M "
+                  f"{result['worker_uss_mb']:>10}M {result['total_pss_mb']:>9}M")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'generated_at': datetime.utcnow().isoformat(), 'results': results}, f, indent=2)
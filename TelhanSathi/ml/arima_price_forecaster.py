@@ -6,23 +6,81 @@ Predicts commodity prices for profit simulator
 import pandas as pd
 import numpy as np
 import pickle
+import copy
 import os
+import sys
+import hashlib
 from pathlib import Path
-from statsmodels.tsa.arima.model import ARIMA
-from statsmodels.graphics.tsaplots import plot_acf, plot_pacf
-from sklearn.metrics import mean_absolute_error, mean_squared_error
 import logging
 import warnings
-from statsmodels.tools.sm_exceptions import ConvergenceWarning
 
-# Suppress ARIMA convergence warnings
+# statsmodels and sklearn are imported only where models are fitted, so that
+# loading and forecasting from saved models stays cheap to import
 warnings.filterwarnings('ignore', category=FutureWarning)
 warnings.filterwarnings('ignore', category=UserWarning)
-warnings.filterwarnings('ignore', category=ConvergenceWarning)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Add ml directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from model_store import LazyModelStore
+from compact_models import to_compact
+from forecast_tensor import ForecastTensor, models_fingerprint, fingerprint_models
+from model_registry import ModelRegistry, RegistryWatcher, link_or_copy, file_checksum
+from order_selection import select_order
+from series_catalog import SeriesCatalog
+from dataset_cache import load_dataset
+from forecast_engines import fit_engine, load_engine_config, engine_for
+from batch_arima import BATCH_ORDER, fit_arima111_batch, results_from_params
+
+# Worker processes used by train_all_combinations (-1 = all cores, 1 = sequential)
+DEFAULT_TRAIN_JOBS = int(os.getenv('ARIMA_TRAIN_JOBS', -1))
+# Order used when training all combinations: 'auto' runs the stepwise search per series
+DEFAULT_ORDER = 'auto' if os.getenv('ARIMA_AUTO_ORDER', '').lower() in ('1', 'true', 'yes') else None
+# Incremental updates: re-estimate after this many new observations...
+REFIT_EVERY_OBSERVATIONS = int(os.getenv('ARIMA_REFIT_EVERY', 30))
+# ...or when the smoothed squared standardized forecast error exceeds this (1.0 = as expected)
+DRIFT_THRESHOLD = float(os.getenv('ARIMA_DRIFT_THRESHOLD', 4.0))
+DRIFT_SMOOTHING = 0.2
+# Opt-in: fit every default-order ARIMA(1,1,1) series at once with conditional
+# least squares (see batch_arima.py). Off by default because CLS estimates differ
+# from statsmodels MLE (up to ~0.14 in phi and ~0.07 in theta on the bundled data)...
+DEFAULT_BATCH_FIT = os.getenv('ARIMA_BATCH_FIT', '').lower() in ('1', 'true', 'yes')
+# ...optionally polishing each estimate with a full statsmodels fit
+DEFAULT_BATCH_REFINE = os.getenv('ARIMA_BATCH_REFINE', '').lower() in ('1', 'true', 'yes')
+
+
+class ModelSet:
+    """
+    Everything forecasts are served from for one registry version: the model
+    store, the ARIMA orders, the forecast tensor and the incremental update
+    bookkeeping. A forecaster swaps in a new set with a single assignment, so
+    readers that take `forecaster.model_set` once never mix two versions.
+    """
+    
+    __slots__ = ('models', 'arima_params', 'forecast_tensor', 'active_model_dir',
+                 'registry_version', 'update_state', 'pending_refits')
+    
+    def __init__(self, models, active_model_dir, registry_version, arima_params=None,
+                 forecast_tensor=None):
+        self.models = models  # {market}_{commodity} -> model (loaded lazily, LRU-bounded)
+        self.arima_params = arima_params if arima_params is not None else {}  # model key -> (p, d, q)
+        self.forecast_tensor = forecast_tensor  # Precomputed forecasts (memory-mapped), see forecast_tensor.py
+        self.active_model_dir = active_model_dir
+        self.registry_version = registry_version  # None = flat (unversioned) layout
+        self.update_state = {}  # {market}_{commodity} -> incremental update bookkeeping
+        self.pending_refits = set()  # Model keys whose refit trigger fired
+
+
+def _model_set_attribute(name):
+    """Forecaster attribute stored on (and read from) the current ModelSet."""
+    return property(
+        lambda self: getattr(self.model_set, name),
+        lambda self, value: setattr(self.model_set, name, value),
+    )
+
 
 class ArimaPriceForecaster:
     """
@@ -30,13 +88,19 @@ class ArimaPriceForecaster:
     Trains market-specific models for each commodity.
     """
     
-    def __init__(self, data_path=None, model_dir=None):
+    def __init__(self, data_path=None, model_dir=None, max_models=None, max_model_bytes=None,
+                 engine_config=None):
         """
         Initialize the forecaster.
         
         Args:
             data_path (str): Path to the CSV dataset
-            model_dir (str): Directory to save trained models
+            model_dir (str): Model registry root (published versions live in
+                model_dir/versions/, see model_registry.py)
+            max_models (int): Maximum models kept in memory (LRU)
+            max_model_bytes (int): Maximum estimated model bytes kept in memory (LRU)
+            engine_config (dict): Forecasting engine per series (see forecast_engines.py);
+                read from FORECAST_ENGINE_CONFIG when omitted
         """
         if data_path is None:
             data_path = os.path.join(os.path.dirname(__file__), 'datasets', 'indian_oilseeds_prices.csv')
@@ -46,9 +110,19 @@ class ArimaPriceForecaster:
         
         self.data_path = data_path
         self.model_dir = model_dir
-        self.df = None
-        self.models = {}  # Store trained models: {market}_{commodity} -> model
-        self.arima_params = {}  # Store ARIMA parameters: {market}_{commodity} -> (p, d, q)
+        self.registry = ModelRegistry(model_dir)
+        registry_version = self.registry.current_version()
+        active_model_dir = self._version_dir(registry_version)
+        self.catalog = None  # SeriesCatalog of the loaded dataset
+        # Models, orders, forecast tensor and update state of the active version
+        self.model_set = ModelSet(
+            LazyModelStore(active_model_dir, max_models=max_models, max_bytes=max_model_bytes),
+            active_model_dir, registry_version,
+        )
+        self.revision = 0  # Bumped whenever data, models or forecasts change (cache invalidation)
+        self._model_version = (None, None, None)  # (revision, model set, version) memo for model_version
+        self.engine_config = engine_config or load_engine_config()
+        self._watcher = None  # RegistryWatcher started by start_hot_reload
         
         # Create model directory if it doesn't exist
         Path(self.model_dir).mkdir(parents=True, exist_ok=True)
@@ -56,58 +130,102 @@ class ArimaPriceForecaster:
         self._load_data()
     
     def _load_data(self):
-        """Load and preprocess the dataset."""
+        """
+        Load and preprocess the dataset, then build its series catalog.
+        The CSV is only parsed when its columnar cache is missing or outdated
+        (see dataset_cache.py). The catalog (which also holds the DataFrame) is swapped in with a
+        single assignment, so concurrent readers never see a mix of old and new data.
+        """
         logger.info(f"Loading data from {self.data_path}")
-        self.df = pd.read_csv(self.data_path)
-        self.df['Date'] = pd.to_datetime(self.df['Date'])
-        self.df = self.df.sort_values('Date').reset_index(drop=True)
-        logger.info(f"Data loaded: {len(self.df)} records")
+        df = load_dataset(self.data_path)
+        self.catalog = SeriesCatalog(df)
+        self.revision += 1
+        logger.info(f"Data loaded: {len(df)} records, {len(self.catalog.keys())} series")
+    
+    def reload_data(self):
+        """Re-read the dataset (e.g. after new prices were appended) and rebuild the catalog."""
+        self._load_data()
+    
+    models = _model_set_attribute('models')
+    arima_params = _model_set_attribute('arima_params')
+    forecast_tensor = _model_set_attribute('forecast_tensor')
+    active_model_dir = _model_set_attribute('active_model_dir')
+    registry_version = _model_set_attribute('registry_version')
+    update_state = _model_set_attribute('update_state')
+    pending_refits = _model_set_attribute('pending_refits')
+    
+    @property
+    def model_version(self):
+        """
+        Short stamp of everything forecasts depend on: the trained models,
+        the dataset file, the forecast tensor and incremental updates.
+
+        Unlike `revision` it is derived from content, so every process that
+        loaded the same files reports the same version (usable in ETags).
+        Recomputed only when `revision` or the model set changes.
+        """
+        current = self.revision
+        model_set = self.model_set
+        revision, memo_set, version = self._model_version
+        if revision == current and memo_set is model_set:
+            return version
+
+        digest = hashlib.sha1(fingerprint_models(model_set.arima_params, model_set.models).encode())
+        digest.update(f"|registry:{model_set.registry_version}".encode())
+        if os.path.exists(self.data_path):
+            stat = os.stat(self.data_path)
+            digest.update(f"|data:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        tensor = model_set.forecast_tensor
+        if tensor is not None:
+            digest.update(f"|tensor:{tensor.models_fingerprint}:{tensor.generated_at}".encode())
+        for model_key in sorted(model_set.update_state):
+            state = model_set.update_state[model_key]
+            digest.update(f"|update:{model_key}:{state['observations_since_fit']}:{state['last_price']}".encode())
+        version = digest.hexdigest()[:16]
+        self._model_version = (current, model_set, version)
+        return version
+    
+    @property
+    def df(self):
+        """The loaded dataset (owned by the current catalog)."""
+        return self.catalog.df if self.catalog is not None else None
+    
+    def _get_catalog(self):
+        if self.catalog is None:
+            self._load_data()
+        return self.catalog
     
     def get_unique_markets(self):
         """Get list of unique markets in dataset."""
-        if self.df is None:
-            self._load_data()
-        return sorted(self.df['Market'].unique().tolist())
+        return list(self._get_catalog().markets)
     
     def get_unique_commodities(self):
         """Get list of unique commodities in dataset."""
-        if self.df is None:
-            self._load_data()
-        return sorted(self.df['Commodity'].unique().tolist())
+        return list(self._get_catalog().commodities)
     
     def get_markets_for_commodity(self, commodity):
         """Get markets that have data for a specific commodity."""
-        if self.df is None:
-            self._load_data()
-        markets = self.df[self.df['Commodity'] == commodity]['Market'].unique().tolist()
-        return sorted(markets)
+        return list(self._get_catalog().markets_for_commodity(commodity))
     
     def get_commodities_for_market(self, market):
         """Get commodities available in a specific market."""
-        if self.df is None:
-            self._load_data()
-        commodities = self.df[self.df['Market'] == market]['Commodity'].unique().tolist()
-        return sorted(commodities)
+        return list(self._get_catalog().commodities_for_market(market))
+    
+    def has_market(self, market):
+        """O(1) check that a market has data."""
+        return self._get_catalog().has_market(market)
+    
+    def has_series(self, market, commodity):
+        """O(1) check that a market-commodity pair has data."""
+        return self._get_catalog().has_series(market, commodity)
     
     def _get_time_series_data(self, market, commodity):
-        """Extract time series data for a specific market and commodity."""
-        data = self.df[(self.df['Market'] == market) & (self.df['Commodity'] == commodity)].copy()
-        data = data.sort_values('Date')
-        
-        # Set date as index
-        data.set_index('Date', inplace=True)
-        
-        # Resample to daily frequency (fill missing dates with forward fill)
-        data = data.asfreq('D')
-        
-        # Forward fill missing prices (use new pandas API)
-        price_series = data['Price'].ffill().bfill()
-        
-        return price_series
+        """Daily price series for a specific market and commodity (from the catalog)."""
+        return self._get_catalog().series(market, commodity)
     
     def _find_arima_parameters(self, price_series, max_p=5, max_d=2, max_q=5):
         """
-        Find optimal ARIMA parameters using AIC.
+        Find ARIMA parameters with a stepwise search on AIC (see order_selection.py).
         
         Args:
             price_series: Time series data
@@ -116,100 +234,208 @@ class ArimaPriceForecaster:
         Returns:
             Tuple of (p, d, q)
         """
-        best_aic = np.inf
-        best_params = (1, 1, 1)
-        
-        logger.info("Finding optimal ARIMA parameters...")
-        
-        for p in range(0, max_p + 1):
-            for d in range(0, max_d + 1):
-                for q in range(0, max_q + 1):
-                    try:
-                        model = ARIMA(price_series, order=(p, d, q))
-                        results = model.fit()
-                        if results.aic < best_aic:
-                            best_aic = results.aic
-                            best_params = (p, d, q)
-                        logger.debug(f"ARIMA{(p, d, q)} - AIC: {results.aic:.2f}")
-                    except:
-                        continue
-        
-        logger.info(f"Best parameters: ARIMA{best_params} with AIC: {best_aic:.2f}")
-        return best_params
+        return select_order(price_series, max_p=max_p, max_d=max_d, max_q=max_q)['order']
     
-    def train_model(self, market, commodity, order=None):
+    def train_model(self, market, commodity, order=None, engine=None):
         """
         Train ARIMA model for a specific market and commodity.
         
         Args:
             market (str): Market name
             commodity (str): Commodity name
-            order (tuple): Optional (p, d, q) parameters. If None, will use default (1, 1, 1).
+            order (tuple): Optional (p, d, q) parameters. If None, will use default (1, 1, 1);
+                'auto' selects the order with a stepwise search.
+            engine (str): 'arima', 'holt' or 'ar' (defaults to the configured engine)
             
         Returns:
             dict: Training metrics including MAE and RMSE
         """
-        logger.info(f"Training model for {market} - {commodity}")
+        if engine is None:
+            engine = engine_for(f"{market}_{commodity}", self.engine_config)
+        logger.info(f"Training {engine} model for {market} - {commodity}")
         
         # Get time series data
         price_series = self._get_time_series_data(market, commodity)
         
-        if len(price_series) < 50:
-            logger.warning(f"Insufficient data for {market} - {commodity} ({len(price_series)} points)")
-            return None
-        
-        # Use default parameters (works well for commodity prices)
-        if order is None:
-            order = (1, 1, 1)
+        results, metrics = _train_series(market, commodity, price_series, order, engine)
+        if results is not None:
+            self._store_trained_model(market, commodity, results, metrics)
+        return metrics
+    
+    def _store_trained_model(self, market, commodity, results, metrics):
+        """Store a fitted model and its parameters."""
+        model_key = f"{market}_{commodity}"
+        self.models[model_key] = results
+        self.arima_params[model_key] = tuple(metrics['order'])
+        self.revision += 1
+    
+    def train_all_combinations(self, n_jobs=None, order=DEFAULT_ORDER, batched=DEFAULT_BATCH_FIT):
+        """
+        Train models for all market-commodity combinations.
         
-        try:
-            # Train model on full dataset
-            model = ARIMA(price_series, order=order)
-            results = model.fit()
-            
-            # Store model and parameters
-            model_key = f"{market}_{commodity}"
-            self.models[model_key] = results
-            self.arima_params[model_key] = order
-            
-            # Calculate metrics
-            predictions = results.fittedvalues
-            mae = mean_absolute_error(price_series[len(order) * 2:], predictions[len(order) * 2:])
-            rmse = np.sqrt(mean_squared_error(price_series[len(order) * 2:], predictions[len(order) * 2:]))
-            
-            metrics = {
-                'market': market,
-                'commodity': commodity,
-                'order': order,
-                'aic': results.aic,
-                'bic': results.bic,
-                'mae': mae,
-                'rmse': rmse,
-                'data_points': len(price_series)
-            }
+        Args:
+            n_jobs (int): Number of worker processes (-1 = all cores, 1 = sequential).
+                Defaults to the ARIMA_TRAIN_JOBS environment variable.
+            order: (p, d, q) for every series, None for (1, 1, 1), or 'auto' to
+                select per series (default 'auto' when ARIMA_AUTO_ORDER is set)
+            batched (bool): Estimate ARIMA(1,1,1) series together (see batch_arima.py)
             
-            logger.info(f"✓ {market} - {commodity}: MAE={mae:.2f}, RMSE={rmse:.2f}")
-            return metrics
-        except Exception as e:
-            logger.error(f"Failed to train {market} - {commodity}: {str(e)}")
-            return None
-    
-    def train_all_combinations(self):
-        """Train models for all market-commodity combinations."""
+        Returns:
+            list: Training metrics of every successfully trained series
+        """
+        from joblib import effective_n_jobs
+        
+        if n_jobs is None:
+            n_jobs = DEFAULT_TRAIN_JOBS
+        
         markets = self.get_unique_markets()
         commodities = self.get_unique_commodities()
+        combinations = [(market, commodity) for market in markets for commodity in commodities]
         
         all_metrics = []
+        if batched and order in (None, BATCH_ORDER):
+            batch = [
+                (market, commodity) for market, commodity in combinations
+                if engine_for(f"{market}_{commodity}", self.engine_config) == 'arima'
+            ]
+            all_metrics.extend(self._train_batched(batch))
+            batch = set(batch)
+            combinations = [pair for pair in combinations if pair not in batch]
         
-        for market in markets:
-            for commodity in commodities:
-                metrics = self.train_model(market, commodity)
+        if effective_n_jobs(n_jobs) == 1 or len(combinations) <= 1:
+            for market, commodity in combinations:
+                metrics = self.train_model(market, commodity, order=order)
                 if metrics:
                     all_metrics.append(metrics)
+        else:
+            all_metrics.extend(self._train_parallel(combinations, n_jobs, order=order))
         
         logger.info(f"Training complete! {len(all_metrics)} models trained successfully")
         return all_metrics
     
+    def _train_batched(self, combinations, refine=DEFAULT_BATCH_REFINE):
+        """
+        Estimate ARIMA(1,1,1) for many series in one vectorized conditional
+        least squares pass, then build each model with a statsmodels filter
+        at those estimates (or a full fit started from them when refine=True).
+        """
+        tasks = []
+        for market, commodity in combinations:
+            price_series = self._get_time_series_data(market, commodity)
+            if len(price_series) < 50:
+                logger.warning(f"Insufficient data for {market} - {commodity} ({len(price_series)} points)")
+                continue
+            tasks.append((market, commodity, price_series))
+        if not tasks:
+            return []
+        
+        estimates = fit_arima111_batch([price_series for _, _, price_series in tasks])
+        logger.info(f"Batched ARIMA{BATCH_ORDER} estimates for {len(tasks)} series in "
+                    f"{estimates['elapsed_seconds']:.2f}s ({estimates['iterations']} iterations, "
+                    f"{int(estimates['converged'].sum())} converged)")
+        
+        all_metrics = []
+        for i, (market, commodity, price_series) in enumerate(tasks):
+            try:
+                results = results_from_params(
+                    price_series, estimates['phi'][i], estimates['theta'][i], estimates['sigma2'][i],
+                    refine=refine
+                )
+            except (ValueError, np.linalg.LinAlgError) as e:
+                logger.error(f"Failed to train {market} - {commodity}: {str(e)}")
+                continue
+            metrics = _arima_metrics(market, commodity, price_series, results, BATCH_ORDER)
+            self._store_trained_model(market, commodity, results, metrics)
+            all_metrics.append(metrics)
+        return all_metrics
+    
+    def _train_parallel(self, combinations, n_jobs, order=None):
+        """
+        Fit series in a joblib process pool.
+        BLAS/OpenMP pools are pinned to one thread per worker so that
+        n_jobs processes do not oversubscribe the cores.
+        """
+        from joblib import Parallel, delayed, parallel_config
+        
+        tasks = [
+            (market, commodity, self._get_time_series_data(market, commodity))
+            for market, commodity in combinations
+        ]
+        
+        logger.info(f"Training {len(tasks)} series with n_jobs={n_jobs}")
+        with parallel_config(backend='loky', inner_max_num_threads=1):
+            outputs = Parallel(n_jobs=n_jobs)(
+                delayed(_train_series_single_threaded)(
+                    market, commodity, price_series, order,
+                    engine_for(f"{market}_{commodity}", self.engine_config)
+                )
+                for market, commodity, price_series in tasks
+            )
+        
+        all_metrics = []
+        for (market, commodity, _), (results, metrics) in zip(tasks, outputs):
+            if results is not None:
+                self._store_trained_model(market, commodity, results, metrics)
+                all_metrics.append(metrics)
+        return all_metrics
+    
+    def forecast_arrays(self, market, commodity, periods=30):
+        """
+        Forecast future prices as NumPy arrays.
+        Served as zero-copy slices of the precomputed forecast tensor when it
+        covers the request, otherwise computed from the model.
+        
+        Args:
+            market (str): Market name
+            commodity (str): Commodity name
+            periods (int): Number of days to forecast
+            
+        Returns:
+            dict: Same keys as forecast(), with array values for the series,
+                plus the 'engine' that produced the forecast
+        """
+        model_key = f"{market}_{commodity}"
+        model_set = self.model_set
+        
+        tensor = self._tensor_for(model_key, periods, model_set)
+        if tensor is not None:
+            forecast, lower_ci, upper_ci = tensor.slice(model_key, periods)
+            last_price = tensor.last_price(model_key)
+            engine = tensor.engine(model_key) or getattr(model_set.models.get(model_key), 'engine', 'arima')
+        else:
+            if model_key not in model_set.models:
+                logger.error(f"Model not found for {market} - {commodity}")
+                return None
+            
+            model = model_set.models[model_key]
+            engine = getattr(model, 'engine', 'arima')
+            
+            # Get forecast
+            forecast_result = model.get_forecast(steps=periods)
+            forecast_df = forecast_result.conf_int()
+            forecast = np.asarray(forecast_result.predicted_mean)
+            lower_ci = forecast_df.iloc[:, 0].to_numpy()
+            upper_ci = forecast_df.iloc[:, 1].to_numpy()
+            last_price = None
+        
+        if last_price is None and model_key in model_set.update_state:
+            last_price = model_set.update_state[model_key]['last_price']
+        if last_price is None:
+            # Get last actual price
+            price_series = self._get_time_series_data(market, commodity)
+            last_price = price_series.iloc[-1]
+        
+        return {
+            'market': market,
+            'commodity': commodity,
+            'last_price': float(last_price),
+            'forecast': forecast,
+            'lower_ci': lower_ci,
+            'upper_ci': upper_ci,
+            'periods': periods,
+            'engine': engine,
+        }
+    
     def forecast(self, market, commodity, periods=30):
         """
         Forecast future prices for a market-commodity combination.
@@ -222,71 +448,500 @@ class ArimaPriceForecaster:
         Returns:
             dict: Contains forecast values, confidence intervals, and last actual price
         """
+        forecast_data = self.forecast_arrays(market, commodity, periods=periods)
+        if forecast_data is None:
+            return None
+        
+        for field in ('forecast', 'lower_ci', 'upper_ci'):
+            forecast_data[field] = np.asarray(forecast_data[field], dtype=float).tolist()
+        return forecast_data
+    
+    def forecast_many(self, keys, periods=30):
+        """
+        Forecast many market-commodity pairs in one call.
+        
+        Series covered by the forecast tensor are read with a single gather;
+        the rest are forecast from their models into the same preallocated arrays.
+        
+        Args:
+            keys (list): (market, commodity) pairs
+            periods (int): Number of days to forecast
+            
+        Returns:
+            dict: Columnar result - 'keys' found, 'missing' keys, 'last_price' (n,)
+                and 'forecast'/'lower_ci'/'upper_ci' (n x periods) arrays
+        """
+        model_set = self.model_set
+        found = []
+        missing = []
+        for market, commodity in keys:
+            if f"{market}_{commodity}" in model_set.models:
+                found.append((market, commodity))
+            else:
+                missing.append((market, commodity))
+        
+        n = len(found)
+        values = np.empty((n, periods, 3), dtype=np.float64)
+        last_prices = np.empty(n, dtype=np.float64)
+        
+        tensor = model_set.forecast_tensor
+        covered = [
+            i for i, (market, commodity) in enumerate(found)
+            if self._tensor_for(f"{market}_{commodity}", periods, model_set) is not None
+        ]
+        if covered:
+            model_keys = [f"{found[i][0]}_{found[i][1]}" for i in covered]
+            values[covered] = tensor.gather(model_keys, periods)
+            last_prices[covered] = [tensor.last_price(model_key) for model_key in model_keys]
+        
+        covered_set = set(covered)
+        for i, (market, commodity) in enumerate(found):
+            if i in covered_set:
+                continue
+            forecast_data = self.forecast_arrays(market, commodity, periods=periods)
+            values[i, :, 0] = forecast_data['forecast']
+            values[i, :, 1] = forecast_data['lower_ci']
+            values[i, :, 2] = forecast_data['upper_ci']
+            last_prices[i] = forecast_data['last_price']
+        
+        return {
+            'keys': found,
+            'missing': missing,
+            'periods': periods,
+            'last_price': last_prices,
+            'forecast': values[:, :, 0],
+            'lower_ci': values[:, :, 1],
+            'upper_ci': values[:, :, 2],
+        }
+    
+    def update(self, market, commodity, new_observations, refit=False):
+        """
+        Extend a trained model with new prices without re-estimating it.
+        
+        The model's state is advanced with a Kalman filter update using the
+        existing parameters (milliseconds per series). A full re-estimation is
+        only flagged when REFIT_EVERY_OBSERVATIONS new points have arrived or
+        the smoothed forecast error crosses DRIFT_THRESHOLD.
+        
+        Args:
+            market (str): Market name
+            commodity (str): Commodity name
+            new_observations: Series of prices indexed by date, or prices for the
+                consecutive days after the model's last observation
+            refit (bool): Re-estimate immediately if a refit trigger fired
+                (requires the new prices to be in the dataset file)
+            
+        Returns:
+            dict: Update summary including drift score and refit trigger
+        """
         model_key = f"{market}_{commodity}"
         
         if model_key not in self.models:
             logger.error(f"Model not found for {market} - {commodity}")
             return None
         
-        model = self.models[model_key]
+        # Append to a copy: the stored model may be serving forecasts in other threads
+        # (and be shared read-only with forked workers); the copy replaces it in one put()
+        model = copy.copy(to_compact(self.models[model_key]))
+        values = _align_new_observations(model, new_observations)
+        errors = model.append(values)
+        self.models.put(model_key, model, unsaved=True)
+        self.revision += 1
         
-        # Get forecast
-        forecast_result = model.get_forecast(steps=periods)
-        forecast_df = forecast_result.conf_int()
-        forecast_df['forecast'] = forecast_result.predicted_mean
+        state = self.update_state.setdefault(model_key, {
+            'observations_since_fit': 0,
+            'drift_score': 1.0,
+            'last_price': None,
+        })
+        for error in errors:
+            state['drift_score'] = (1 - DRIFT_SMOOTHING) * state['drift_score'] + DRIFT_SMOOTHING * error ** 2
+        state['observations_since_fit'] += len(values)
+        if len(values):
+            state['last_price'] = float(values[-1])
         
-        # Get last actual price
-        price_series = self._get_time_series_data(market, commodity)
-        last_price = price_series.iloc[-1]
+        refit_reason = None
+        if state['drift_score'] > DRIFT_THRESHOLD:
+            refit_reason = 'drift'
+        elif state['observations_since_fit'] >= REFIT_EVERY_OBSERVATIONS:
+            refit_reason = 'schedule'
+        if refit_reason:
+            self.pending_refits.add(model_key)
+            logger.info(f"Refit triggered for {market} - {commodity} ({refit_reason})")
         
-        return {
+        summary = {
             'market': market,
             'commodity': commodity,
-            'last_price': float(last_price),
-            'forecast': forecast_df['forecast'].tolist(),
-            'lower_ci': forecast_df.iloc[:, 0].tolist(),
-            'upper_ci': forecast_df.iloc[:, 1].tolist(),
-            'periods': periods
+            'observations_added': len(values),
+            'last_date': model.last_date.strftime('%Y-%m-%d'),
+            'drift_score': round(float(state['drift_score']), 4),
+            'observations_since_fit': state['observations_since_fit'],
+            'refit_reason': refit_reason,
+            'refitted': False,
         }
+        
+        if refit_reason and refit:
+            summary['refitted'] = bool(self.refit_pending([model_key]))
+        return summary
+    
+    def refit_pending(self, model_keys=None):
+        """
+        Fully re-estimate models whose refit trigger fired.
+        Reloads the dataset first, so newly ingested prices must already be in the CSV.
+        
+        Args:
+            model_keys (list): Subset of pending keys to refit (default: all pending)
+            
+        Returns:
+            list: Training metrics of the refitted models
+        """
+        model_keys = sorted(self.pending_refits if model_keys is None else model_keys)
+        if not model_keys:
+            return []
+        
+        self.reload_data()
+        all_metrics = []
+        for model_key in model_keys:
+            market, commodity = model_key.split('_', 1)
+            metrics = self.train_model(market, commodity, order=self.arima_params.get(model_key))
+            if metrics:
+                all_metrics.append(metrics)
+                self.pending_refits.discard(model_key)
+                self.update_state.pop(model_key, None)
+        return all_metrics
     
-    def save_models(self):
-        """Save all trained models to disk."""
-        for model_key, model in self.models.items():
-            model_path = os.path.join(self.model_dir, f"{model_key}.pkl")
-            with open(model_path, 'wb') as f:
-                pickle.dump(model, f)
-            logger.info(f"Model saved: {model_path}")
+    def save_models(self, model_format='compact'):
+        """
+        Publish all models as a new registry version and switch to it.
+        
+        Models held in memory are written; the rest are hard-linked from the
+        active version. The set only becomes visible (to this and every other
+        process) once it is complete, through the registry's atomic pointer swap.
+        
+        Args:
+            model_format (str): 'compact' for parameter-only .npz files (KB each),
+                'pickle' for full ARIMAResults pickles
+            
+        Returns:
+            str: The published version
+        """
+        loaded = dict(self.models.loaded_items())
+        staging_dir = self.registry.stage()
+        try:
+            for model_key in self.models.keys():
+                if model_key in loaded:
+                    if model_format == 'compact':
+                        to_compact(loaded[model_key]).save(os.path.join(staging_dir, f"{model_key}.npz"))
+                    else:
+                        with open(os.path.join(staging_dir, f"{model_key}.pkl"), 'wb') as f:
+                            pickle.dump(loaded[model_key], f)
+                else:
+                    model_path = self.models.model_path(model_key)
+                    if os.path.exists(model_path):
+                        link_or_copy(model_path, os.path.join(staging_dir, os.path.basename(model_path)))
+            
+            # Save parameters
+            with open(os.path.join(staging_dir, 'arima_params.pkl'), 'wb') as f:
+                pickle.dump(self.arima_params, f)
+            
+            version = self.registry.publish(staging_dir, metadata={
+                'models': len(self.models),
+                'format': model_format,
+                'data_path': self.data_path,
+            })
+        except Exception:
+            self.registry.discard(staging_dir)
+            raise
         
-        # Save parameters
-        params_path = os.path.join(self.model_dir, 'arima_params.pkl')
-        with open(params_path, 'wb') as f:
-            pickle.dump(self.arima_params, f)
-        logger.info(f"Parameters saved: {params_path}")
+        # The in-memory models are exactly what was published: just repoint the store
+        self.registry_version = version
+        self.active_model_dir = self._version_dir(version)
+        self.models.model_dir = self.active_model_dir
+        for model_key in loaded:
+            self.models.mark_saved(model_key)
+        logger.info(f"Models saved: {len(self.models)} as version {version}")
+        self.load_forecast_tensor()
+        return version
     
     def load_models(self):
-        """Load trained models from disk."""
-        params_path = os.path.join(self.model_dir, 'arima_params.pkl')
-        if os.path.exists(params_path):
-            with open(params_path, 'rb') as f:
-                self.arima_params = pickle.load(f)
+        """
+        Register trained models of the active registry version.
+        Models are only unpickled on first use (see LazyModelStore).
+        """
+        self.registry_version = self.registry.current_version()
+        self.active_model_dir = self._version_dir(self.registry_version)
+        self.models.model_dir = self.active_model_dir
+        self.arima_params = _load_params(self.active_model_dir)
         
-        # Load individual models
+        # Register individual models
         for model_key in self.arima_params.keys():
-            model_path = os.path.join(self.model_dir, f"{model_key}.pkl")
+            model_path = self.models.model_path(model_key)
             if os.path.exists(model_path):
-                with open(model_path, 'rb') as f:
-                    self.models[model_key] = pickle.load(f)
+                self.models.register(model_key)
+        
+        logger.info(f"Registered {len(self.models)} models from disk (lazy loading)")
+        
+        self.load_forecast_tensor()
+    
+    def reload_models(self, version=None):
+        """
+        Hot-swap to another registry version (default: the active one).
+        
+        The new version is verified and opened off to the side; models hot in
+        this process are preloaded from it unless the forecast tensor answers
+        requests, and only then is the new ModelSet swapped in with a single
+        assignment. Requests keep being served from the old set until that point.
+        
+        Unsaved models (incremental updates, fresh training), their update
+        state and queued refits carry over for every series whose model file
+        is unchanged in the new version; series the new version retrained or
+        removed start from the published set (logged as a warning).
+        
+        Returns:
+            bool: True if a different version was loaded
+        """
+        if version is None:
+            version = self.registry.current_version()
+        if version == self.registry_version:
+            return False
+        
+        if version is not None:
+            self.registry.verify(version)
+        directory = self._version_dir(version)
+        arima_params = _load_params(directory)
+        store = LazyModelStore(directory, max_models=self.models.max_models, max_bytes=self.models.max_bytes)
+        for model_key in arima_params:
+            if os.path.exists(store.model_path(model_key)):
+                store.register(model_key)
+        
+        tensor = ForecastTensor.load(directory)
+        if tensor is not None and tensor.models_fingerprint != fingerprint_models(arima_params, store):
+            tensor = None
+        if tensor is None:
+            for model_key, _ in self.models.loaded_items():
+                if model_key in store:
+                    store.get(model_key)
         
-        logger.info(f"Loaded {len(self.models)} models from disk")
+        model_set = ModelSet(store, directory, version, arima_params=arima_params, forecast_tensor=tensor)
+        self._carry_over_unsaved(self.model_set, model_set)
+        self.model_set = model_set
+        self.revision += 1
+        logger.info(f"Hot-reloaded model version {version}: {len(store)} models, "
+                    f"forecast tensor {'mapped' if tensor is not None else 'not available'}")
+        return True
+    
+    @staticmethod
+    def _carry_over_unsaved(old_set, new_set):
+        """Move unsaved models, update state and pending refits into a new set where still valid."""
+        def unchanged(model_key):
+            old_path = old_set.models.model_path(model_key)
+            new_path = new_set.models.model_path(model_key)
+            if not os.path.exists(old_path):
+                # Trained in this process and never saved: only valid if the new version lacks it too
+                return not os.path.exists(new_path)
+            return os.path.exists(new_path) and (
+                os.path.samefile(old_path, new_path) or file_checksum(old_path) == file_checksum(new_path)
+            )
+        
+        for model_key, model in old_set.models.unsaved_items():
+            if unchanged(model_key):
+                new_set.models.put(model_key, model, unsaved=True)
+                if model_key in old_set.arima_params:
+                    new_set.arima_params.setdefault(model_key, old_set.arima_params[model_key])
+            else:
+                logger.warning(f"Unsaved changes to {model_key} dropped: changed or removed in version "
+                               f"{new_set.registry_version}")
+        carried = new_set.models.unsaved_items()
+        carried_keys = {model_key for model_key, _ in carried}
+        new_set.update_state = {
+            model_key: state for model_key, state in old_set.update_state.items() if model_key in carried_keys
+        }
+        new_set.pending_refits = {
+            model_key for model_key in old_set.pending_refits
+            if model_key in carried_keys or unchanged(model_key)
+        }
+    
+    def start_hot_reload(self, interval=None, on_reload=None):
+        """
+        Watch the registry pointer in a background thread and hot-swap to
+        newly published (or rolled back) versions.
+        
+        Args:
+            interval (float): Poll interval in seconds (MODEL_RELOAD_INTERVAL)
+            on_reload (callable): Called after each successful swap
+        """
+        if self._watcher is not None and self._watcher.is_alive():
+            return self._watcher
+        
+        def swap(version):
+            if self.reload_models(version) and on_reload is not None:
+                on_reload()
+        
+        self._watcher = RegistryWatcher(self.registry, swap, interval=interval)
+        self._watcher.last_version = self.registry_version
+        self._watcher.start()
+        return self._watcher
+    
+    def stop_hot_reload(self):
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+    
+    def _version_dir(self, version):
+        return self.registry.version_dir(version) if version else self.model_dir
+    
+    def _tensor_for(self, model_key, periods, model_set=None):
+        """The forecast tensor if it can answer this request (not after an incremental update)."""
+        model_set = model_set or self.model_set
+        tensor = model_set.forecast_tensor
+        if tensor is None or model_key in model_set.update_state or not tensor.covers(model_key, periods):
+            return None
+        return tensor
+    
+    def load_forecast_tensor(self):
+        """
+        Memory-map the precomputed forecast tensor if it matches the loaded models.
+        
+        Returns:
+            bool: True if the tensor is in use
+        """
+        tensor = ForecastTensor.load(self.active_model_dir)
+        if tensor is not None and tensor.models_fingerprint != models_fingerprint(self):
+            logger.warning("Forecast tensor is stale (models changed) - forecasting on demand")
+            tensor = None
+        
+        self.forecast_tensor = tensor
+        self.revision += 1
+        if tensor is not None:
+            logger.info(f"Forecast tensor mapped: {len(tensor.keys)} series x {tensor.horizon} days")
+        return tensor is not None
+    
+    def get_model_cache_stats(self):
+        """Return hit/miss/eviction counters of the model store."""
+        return self.models.stats()
 
 
-def initialize_and_train_forecaster():
+def _train_series(market, commodity, price_series, order=None, engine='arima'):
+    """
+    Fit a model on one price series with the given engine
+    ('arima' via statsmodels, or one of the NumPy engines in forecast_engines.py).
+    
+    Returns:
+        tuple: (results, metrics), or (None, None) if the series could not be trained
+    """
+    if len(price_series) < 50:
+        logger.warning(f"Insufficient data for {market} - {commodity} ({len(price_series)} points)")
+        return None, None
+    
+    if engine != 'arima':
+        try:
+            model, errors = fit_engine(engine, price_series, order=order if isinstance(order, tuple) else None)
+        except (ValueError, np.linalg.LinAlgError) as e:
+            logger.error(f"Failed to train {market} - {commodity}: {str(e)}")
+            return None, None
+        mae = float(np.mean(np.abs(errors)))
+        rmse = float(np.sqrt(np.mean(np.square(errors))))
+        logger.info(f"✓ {market} - {commodity} ({engine}): MAE={mae:.2f}, RMSE={rmse:.2f}")
+        return model, {
+            'market': market,
+            'commodity': commodity,
+            'engine': engine,
+            'order': model.order,
+            'aic': model.aic,
+            'bic': model.bic,
+            'mae': mae,
+            'rmse': rmse,
+            'data_points': len(price_series)
+        }
+    
+    from statsmodels.tsa.arima.model import ARIMA
+    from statsmodels.tools.sm_exceptions import ConvergenceWarning
+    
+    # Suppress ARIMA convergence warnings
+    warnings.filterwarnings('ignore', category=ConvergenceWarning)
+    
+    # Use default parameters (works well for commodity prices)
+    if order is None:
+        order = (1, 1, 1)
+    elif order == 'auto':
+        order = select_order(price_series)['order']
+    
+    try:
+        # Train model on full dataset
+        model = ARIMA(price_series, order=order)
+        results = model.fit()
+        return results, _arima_metrics(market, commodity, price_series, results, order)
+    except Exception as e:
+        logger.error(f"Failed to train {market} - {commodity}: {str(e)}")
+        return None, None
+
+
+def _load_params(directory):
+    """ARIMA orders saved with a model set ({} if none)."""
+    params_path = os.path.join(directory, 'arima_params.pkl')
+    if not os.path.exists(params_path):
+        return {}
+    with open(params_path, 'rb') as f:
+        return pickle.load(f)
+
+
+def _arima_metrics(market, commodity, price_series, results, order):
+    """Training metrics of fitted ARIMAResults (in-sample MAE/RMSE)."""
+    from sklearn.metrics import mean_absolute_error, mean_squared_error
+    
+    # Calculate metrics
+    predictions = results.fittedvalues
+    mae = mean_absolute_error(price_series[len(order) * 2:], predictions[len(order) * 2:])
+    rmse = np.sqrt(mean_squared_error(price_series[len(order) * 2:], predictions[len(order) * 2:]))
+    
+    logger.info(f"✓ {market} - {commodity}: MAE={mae:.2f}, RMSE={rmse:.2f}")
+    return {
+        'market': market,
+        'commodity': commodity,
+        'engine': 'arima',
+        'order': order,
+        'aic': results.aic,
+        'bic': results.bic,
+        'mae': mae,
+        'rmse': rmse,
+        'data_points': len(price_series)
+    }
+
+
+def _align_new_observations(model, new_observations):
+    """
+    Turn new prices into the consecutive daily values following the model's
+    last observation (dated input is resampled and forward filled like training data).
+    """
+    if isinstance(new_observations, pd.Series) and isinstance(new_observations.index, pd.DatetimeIndex):
+        new_observations = new_observations.sort_index()
+        new_observations = new_observations[new_observations.index > model.last_date]
+        if new_observations.empty:
+            return np.array([])
+        dates = pd.date_range(model.last_date, new_observations.index[-1], freq=model.freq)
+        daily = new_observations.groupby(level=0).last().reindex(dates)
+        daily.iloc[0] = model.last_observations[-1]
+        return daily.ffill().to_numpy(dtype=float)[1:]
+    return np.asarray(new_observations, dtype=float).ravel()
+
+
+def _train_series_single_threaded(market, commodity, price_series, order=None, engine='arima'):
+    """Worker entry point: fit one series with BLAS limited to a single thread."""
+    from threadpoolctl import threadpool_limits
+    
+    with threadpool_limits(limits=1):
+        return _train_series(market, commodity, price_series, order, engine)
+
+
+def initialize_and_train_forecaster(n_jobs=None):
     """
     Utility function to initialize and train all models.
     Call this once to train and save all models.
+    
+    Args:
+        n_jobs (int): Number of training worker processes (see train_all_combinations)
     """
     forecaster = ArimaPriceForecaster()
-    metrics_list = forecaster.train_all_combinations()
+    metrics_list = forecaster.train_all_combinations(n_jobs=n_jobs)
     forecaster.save_models()
     
     # Print summary
@@ -305,7 +960,7 @@ def get_forecaster():
     forecaster = ArimaPriceForecaster()
     
     # Try to load existing models
-    params_path = os.path.join(forecaster.model_dir, 'arima_params.pkl')
+    params_path = os.path.join(forecaster.active_model_dir, 'arima_params.pkl')
     if os.path.exists(params_path):
         logger.info("Loading pre-trained models...")
         forecaster.load_models()
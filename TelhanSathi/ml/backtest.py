@@ -0,0 +1,289 @@
+"""
+Rolling-Origin Backtesting and Forecast Benchmark
+Evaluates every market-commodity series on several forecast horizons with
+rolling-origin splits and records accuracy together with fit time, forecast
+time and memory per model, in a machine-readable JSON report
+"""
+
+import os
+import sys
+import io
+import json
+import time
+import pickle
+import argparse
+import logging
+import tracemalloc
+import warnings
+from datetime import datetime
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Add ml directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from compact_models import to_compact
+from forecast_engines import fit_engine, engine_for, ENGINE_NAMES
+
+DEFAULT_HORIZONS = (7, 30, 90)
+DEFAULT_FOLDS = 5
+DEFAULT_MIN_TRAIN = 365
+DEFAULT_ALPHA = 0.05
+
+
+def rolling_origins(n_observations, max_horizon, n_folds=DEFAULT_FOLDS, min_train=DEFAULT_MIN_TRAIN):
+    """
+    Forecast origins (training lengths) spread evenly between min_train and
+    the last point that still leaves max_horizon observations to score.
+    """
+    last_origin = n_observations - max_horizon
+    if last_origin < min_train:
+        return []
+    origins = np.linspace(min_train, last_origin, num=min(n_folds, last_origin - min_train + 1))
+    return sorted(set(int(origin) for origin in origins))
+
+
+def _fit_arima(train_series, order):
+    from statsmodels.tsa.arima.model import ARIMA
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return ARIMA(train_series, order=order).fit()
+
+
+def _fit_compact(train_series, order, engine):
+    """Fit with the given engine and return the model served in production."""
+    if engine == 'arima':
+        results = _fit_arima(train_series, order)
+        return results, to_compact(results)
+    model, _ = fit_engine(engine, train_series, order=order)
+    return model, model
+
+
+def run_fold(price_series, origin, horizons, order, alpha=DEFAULT_ALPHA, engine='arima'):
+    """
+    Fit on the first `origin` observations, forecast max(horizons) steps and
+    score each horizon against the held-out observations.
+
+    Returns:
+        dict: Per-horizon errors plus fit/forecast timings and model memory
+    """
+    from threadpoolctl import threadpool_limits
+
+    max_horizon = max(horizons)
+    actual = price_series.iloc[origin:origin + max_horizon].to_numpy(dtype=float)
+
+    with threadpool_limits(limits=1):
+        tracemalloc.start()
+        started = time.perf_counter()
+        try:
+            results, model = _fit_compact(price_series.iloc[:origin], order, engine)
+        except (ValueError, np.linalg.LinAlgError) as e:
+            tracemalloc.stop()
+            return {'origin': origin, 'error': str(e)}
+        fit_seconds = time.perf_counter() - started
+        peak_fit_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        # Time forecasts on the representation served in production
+        started = time.perf_counter()
+        forecast_result = model.get_forecast(steps=max_horizon)
+        conf_int = forecast_result.conf_int(alpha=alpha)
+        forecast_seconds = time.perf_counter() - started
+
+    mean = np.asarray(forecast_result.predicted_mean, dtype=float)
+    lower = conf_int.iloc[:, 0].to_numpy()
+    upper = conf_int.iloc[:, 1].to_numpy()
+
+    scores = {}
+    for horizon in horizons:
+        error = mean[:horizon] - actual[:horizon]
+        scores[str(horizon)] = {
+            'mae': float(np.mean(np.abs(error))),
+            'rmse': float(np.sqrt(np.mean(error ** 2))),
+            'mape': float(np.mean(np.abs(error) / np.abs(actual[:horizon])) * 100),
+            'coverage': float(np.mean((actual[:horizon] >= lower[:horizon]) & (actual[:horizon] <= upper[:horizon]))),
+        }
+
+    return {
+        'origin': origin,
+        'horizons': scores,
+        'fit_seconds': fit_seconds,
+        'forecast_seconds': forecast_seconds,
+        'peak_fit_memory_bytes': peak_fit_bytes,
+        'model_bytes_pickle': len(pickle.dumps(results, protocol=pickle.HIGHEST_PROTOCOL)),
+        'model_bytes_compact': _saved_size(model),
+    }
+
+
+def _saved_size(model):
+    """Size of the model's .npz file."""
+    buffer = io.BytesIO()
+    model.save(buffer)
+    return buffer.getbuffer().nbytes
+
+
+def _summarize_folds(folds, horizons):
+    ok = [fold for fold in folds if 'error' not in fold]
+    summary = {
+        'folds': len(folds),
+        'failed_folds': len(folds) - len(ok),
+    }
+    if not ok:
+        return summary
+
+    summary['horizons'] = {
+        str(horizon): {
+            metric: float(np.mean([fold['horizons'][str(horizon)][metric] for fold in ok]))
+            for metric in ('mae', 'rmse', 'mape', 'coverage')
+        }
+        for horizon in horizons
+    }
+    summary['fit_seconds_mean'] = float(np.mean([fold['fit_seconds'] for fold in ok]))
+    summary['forecast_ms_mean'] = float(np.mean([fold['forecast_seconds'] for fold in ok]) * 1000)
+    summary['peak_fit_memory_kb'] = float(np.max([fold['peak_fit_memory_bytes'] for fold in ok]) / 1024)
+    summary['model_kb_pickle'] = float(np.mean([fold['model_bytes_pickle'] for fold in ok]) / 1024)
+    summary['model_kb_compact'] = float(np.mean([fold['model_bytes_compact'] for fold in ok]) / 1024)
+    return summary
+
+
+def backtest(forecaster, horizons=DEFAULT_HORIZONS, n_folds=DEFAULT_FOLDS, min_train=DEFAULT_MIN_TRAIN,
+             n_jobs=-1, series_keys=None, alpha=DEFAULT_ALPHA, engines=None):
+    """
+    Backtest every (market, commodity) series with rolling-origin splits.
+    All folds of all series are evaluated in one joblib process pool.
+
+    Args:
+        forecaster: ArimaPriceForecaster (data loaded; arima_params give the orders)
+        horizons (tuple): Forecast horizons in days
+        n_folds (int): Forecast origins per series
+        min_train (int): Minimum training length in days
+        n_jobs (int): Worker processes (-1 = all cores)
+        series_keys (list): Optional (market, commodity) subset
+        alpha (float): Significance level used for interval coverage
+        engines (list): Engines to evaluate on every series (default: the
+            engine configured for each series)
+
+    Returns:
+        dict: Report with per-series results and an overall summary
+    """
+    from joblib import Parallel, delayed, parallel_config
+
+    horizons = tuple(sorted(int(h) for h in horizons))
+    if series_keys is None:
+        series_keys = forecaster.catalog.keys()
+
+    tasks = []
+    series_info = {}
+    for market, commodity in series_keys:
+        price_series = forecaster._get_time_series_data(market, commodity)
+        model_key = f"{market}_{commodity}"
+        origins = rolling_origins(len(price_series), max(horizons), n_folds=n_folds, min_train=min_train)
+        for engine in engines or [engine_for(model_key, forecaster.engine_config)]:
+            # The trained order applies to ARIMA; NumPy engines choose their own
+            order = tuple(forecaster.arima_params.get(model_key, (1, 1, 1))) if engine == 'arima' else None
+            report_key = (model_key, engine)
+            series_info[report_key] = {'market': market, 'commodity': commodity, 'engine': engine,
+                                       'order': list(order) if order else None,
+                                       'observations': len(price_series)}
+            tasks.extend((report_key, price_series, origin, order, engine) for origin in origins)
+
+    logger.info(f"Backtesting {len(series_info)} series, {len(tasks)} folds, horizons={horizons}")
+    started = time.perf_counter()
+    with parallel_config(backend='loky', inner_max_num_threads=1):
+        outputs = Parallel(n_jobs=n_jobs)(
+            delayed(run_fold)(price_series, origin, horizons, order, alpha, engine)
+            for _, price_series, origin, order, engine in tasks
+        )
+    elapsed = time.perf_counter() - started
+
+    folds_by_series = {}
+    for (report_key, _, _, _, _), fold in zip(tasks, outputs):
+        folds_by_series.setdefault(report_key, []).append(fold)
+
+    series_reports = []
+    for report_key, info in series_info.items():
+        folds = folds_by_series.get(report_key, [])
+        series_reports.append({**info, **_summarize_folds(folds, horizons), 'fold_results': folds})
+
+    overall = {'wall_seconds': elapsed}
+    for engine in dict.fromkeys(info['engine'] for info in series_info.values()):
+        overall[engine] = _summarize_engine(
+            [report for report in series_reports if report['engine'] == engine], horizons
+        )
+
+    return {
+        'generated_at': datetime.utcnow().isoformat(),
+        'config': {
+            'horizons': list(horizons),
+            'folds': n_folds,
+            'min_train': min_train,
+            'alpha': alpha,
+            'n_jobs': n_jobs,
+            'engines': list(engines) if engines else None,
+            'data_path': forecaster.data_path,
+        },
+        'summary': overall,
+        'series': series_reports,
+    }
+
+
+def _summarize_engine(series_reports, horizons):
+    """Average the per-series summaries of one engine."""
+    scored = [report for report in series_reports if 'horizons' in report]
+    summary = {
+        'series': len(series_reports),
+        'series_scored': len(scored),
+    }
+    if scored:
+        summary['horizons'] = {
+            str(horizon): {
+                metric: float(np.mean([report['horizons'][str(horizon)][metric] for report in scored]))
+                for metric in ('mae', 'rmse', 'mape', 'coverage')
+            }
+            for horizon in horizons
+        }
+        for metric in ('fit_seconds_mean', 'forecast_ms_mean', 'model_kb_pickle', 'model_kb_compact'):
+            summary[metric] = float(np.mean([report[metric] for report in scored]))
+        summary['peak_fit_memory_kb'] = float(np.max([report['peak_fit_memory_kb'] for report in scored]))
+    return summary
+
+
+def write_report(report, output_path=None):
+    """Write a backtest report as JSON (default: ml/reports/backtest_<timestamp>.json)."""
+    if output_path is None:
+        report_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'reports')
+        os.makedirs(report_dir, exist_ok=True)
+        output_path = os.path.join(report_dir, f"backtest_{datetime.utcnow():%Y%m%d_%H%M%S}.json")
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Backtest report written: {output_path}")
+    return output_path
+
+
+if __name__ == "__main__":
+    from arima_price_forecaster import get_forecaster
+
+    parser = argparse.ArgumentParser(description='Rolling-origin backtest of the price forecaster')
+    parser.add_argument('--horizons', default=','.join(str(h) for h in DEFAULT_HORIZONS))
+    parser.add_argument('--folds', type=int, default=DEFAULT_FOLDS)
+    parser.add_argument('--min-train', type=int, default=DEFAULT_MIN_TRAIN)
+    parser.add_argument('--jobs', type=int, default=-1)
+    parser.add_argument('--engines', default=None,
+                        help=f"Comma-separated engines to compare ({', '.join(ENGINE_NAMES)})")
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    report = backtest(
+        get_forecaster(),
+        horizons=[int(h) for h in args.horizons.split(',')],
+        n_folds=args.folds,
+        min_train=args.min_train,
+        n_jobs=args.jobs,
+        engines=args.engines.split(',') if args.engines else None,
+    )
+    write_report(report, args.output)
+    print(json.dumps(report['summary'], indent=2))
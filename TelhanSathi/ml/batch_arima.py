@@ -0,0 +1,162 @@
+"""
+Batched ARIMA(1,1,1) Estimation
+Fits the default order for many series at once: the differenced series are
+stacked into one aligned array and (phi, theta) are estimated by conditional
+least squares with Levenberg-Marquardt steps vectorized across series.
+statsmodels is then only used to filter (not optimize) at the estimates
+"""
+
+import time
+import logging
+import warnings
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BATCH_ORDER = (1, 1, 1)
+# Coefficients are kept inside the stationary/invertible region
+MAX_COEFFICIENT = 0.995
+DEFAULT_MAX_ITER = 50
+DEFAULT_TOLERANCE = 1e-6
+
+
+def stack_differences(series_list):
+    """
+    Right-align the first differences of several series in one array.
+
+    Series are left-padded with zeros; with zero padding the CLS residual
+    recursion stays at exactly zero until a series starts, so one time loop
+    serves every series. The mask marks the residuals that are scored
+    (from the second difference of each series onwards).
+
+    Returns:
+        tuple: (differences [n_series x T], mask [n_series x T])
+    """
+    differences = [np.diff(np.asarray(series, dtype=float)) for series in series_list]
+    length = max(len(d) for d in differences)
+    stacked = np.zeros((len(differences), length))
+    mask = np.zeros((len(differences), length), dtype=bool)
+    for i, d in enumerate(differences):
+        stacked[i, length - len(d):] = d
+        mask[i, length - len(d) + 1:] = True
+    return stacked, mask
+
+
+def _residuals_and_jacobian(x, phi, theta):
+    """
+    CLS residuals e_t = x_t - phi x_{t-1} - theta e_{t-1} and their derivatives
+    with respect to (phi, theta), for every series at once.
+    """
+    n_series, length = x.shape
+    residuals = np.empty_like(x)
+    d_phi = np.empty_like(x)
+    d_theta = np.empty_like(x)
+
+    previous_x = np.zeros(n_series)
+    previous_e = np.zeros(n_series)
+    previous_d_phi = np.zeros(n_series)
+    previous_d_theta = np.zeros(n_series)
+    for t in range(length):
+        x_t = x[:, t]
+        e_t = x_t - phi * previous_x - theta * previous_e
+        previous_d_phi = -previous_x - theta * previous_d_phi
+        previous_d_theta = -previous_e - theta * previous_d_theta
+        residuals[:, t] = e_t
+        d_phi[:, t] = previous_d_phi
+        d_theta[:, t] = previous_d_theta
+        previous_x = x_t
+        previous_e = e_t
+    return residuals, np.stack([d_phi, d_theta], axis=-1)
+
+
+def fit_arima111_batch(series_list, max_iter=DEFAULT_MAX_ITER, tol=DEFAULT_TOLERANCE):
+    """
+    Conditional least squares ARIMA(1,1,1) (no constant) for many series.
+
+    Args:
+        series_list (list): Price series (any lengths)
+        max_iter (int): Maximum Levenberg-Marquardt iterations
+        tol (float): Relative change in the sum of squares that counts as converged
+
+    Returns:
+        dict: 'phi', 'theta', 'sigma2' arrays (one value per series), 'iterations',
+            'converged' flags and 'elapsed_seconds'
+    """
+    started = time.perf_counter()
+    x, mask = stack_differences(series_list)
+    n_series = len(x)
+    counts = mask.sum(axis=1)
+
+    # Start from the lag-1 autocorrelation of the differences and no MA term
+    centred = np.where(mask, x - (x * mask).sum(axis=1, keepdims=True) / counts[:, None], 0.0)
+    phi = np.clip((centred[:, 1:] * centred[:, :-1]).sum(axis=1) / np.maximum((centred ** 2).sum(axis=1), 1e-12),
+                  -0.5, 0.5)
+    theta = np.zeros(n_series)
+    damping = np.full(n_series, 1e-3)
+
+    residuals, jacobian = _residuals_and_jacobian(x, phi, theta)
+    sse = (np.where(mask, residuals, 0.0) ** 2).sum(axis=1)
+    converged = np.zeros(n_series, dtype=bool)
+
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        J = np.where(mask[:, :, None], jacobian, 0.0)
+        e = np.where(mask, residuals, 0.0)
+        JtJ = np.einsum('ntk,ntl->nkl', J, J)
+        Jte = np.einsum('ntk,nt->nk', J, e)
+
+        # Levenberg-Marquardt step per series (2x2 systems solved in one call)
+        diagonal = np.einsum('nkk->nk', JtJ)
+        lhs = JtJ + damping[:, None, None] * diagonal[:, :, None] * np.eye(2)
+        step = np.linalg.solve(lhs, -Jte[:, :, None])[:, :, 0]
+        step[converged] = 0.0
+
+        new_phi = np.clip(phi + step[:, 0], -MAX_COEFFICIENT, MAX_COEFFICIENT)
+        new_theta = np.clip(theta + step[:, 1], -MAX_COEFFICIENT, MAX_COEFFICIENT)
+        new_residuals, new_jacobian = _residuals_and_jacobian(x, new_phi, new_theta)
+        new_sse = (np.where(mask, new_residuals, 0.0) ** 2).sum(axis=1)
+
+        improved = (new_sse < sse) & ~converged
+        relative_change = np.abs(sse - new_sse) / np.maximum(sse, 1e-12)
+        # Size of the step actually taken (clipping at the bounds can cancel it)
+        step_size = np.maximum(np.abs(new_phi - phi), np.abs(new_theta - theta))
+        converged |= (relative_change < tol) | (step_size < 1e-6) | (damping > 1e8)
+
+        phi = np.where(improved, new_phi, phi)
+        theta = np.where(improved, new_theta, theta)
+        sse = np.where(improved, new_sse, sse)
+        residuals = np.where(improved[:, None], new_residuals, residuals)
+        jacobian = np.where(improved[:, None, None], new_jacobian, jacobian)
+        damping = np.where(improved, damping / 10, damping * 10)
+
+        if converged.all():
+            break
+
+    return {
+        'phi': phi,
+        'theta': theta,
+        'sigma2': sse / counts,
+        'iterations': iterations,
+        'converged': converged,
+        'elapsed_seconds': time.perf_counter() - started,
+    }
+
+
+def results_from_params(price_series, phi, theta, sigma2, refine=False):
+    """
+    Build ARIMAResults for estimated parameters.
+
+    With refine=False the model is only filtered at the CLS estimates (no
+    optimization); with refine=True full MLE starts from them.
+    """
+    from statsmodels.tsa.arima.model import ARIMA
+
+    params = np.array([phi, theta, sigma2])
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        model = ARIMA(price_series, order=BATCH_ORDER)
+        if refine:
+            return model.fit(start_params=params)
+        return model.filter(params)
@@ -0,0 +1,270 @@
+"""
+Compact ARIMA Model Format
+Stores only what forecasting needs (coefficients, state-space matrices,
+final filtered state and the last observations) in a small .npz file,
+and rebuilds a forecast-capable model from it without statsmodels
+"""
+
+import os
+import sys
+import glob
+import pickle
+import logging
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Number of trailing observations kept with each model
+DEFAULT_TAIL_LENGTH = 60
+
+# State-space system matrices copied from the fitted results
+SYSTEM_MATRICES = ('design', 'obs_intercept', 'obs_cov', 'transition',
+                   'state_intercept', 'selection', 'state_cov')
+
+
+class CompactForecast:
+    """Minimal stand-in for statsmodels' PredictionResults."""
+
+    def __init__(self, predicted_mean, variance):
+        self.predicted_mean = predicted_mean
+        self.var_pred_mean = pd.Series(variance, index=predicted_mean.index)
+        self.se_mean = np.sqrt(self.var_pred_mean)
+
+    def conf_int(self, alpha=0.05):
+        """Return a DataFrame of lower/upper bounds, like statsmodels."""
+        z = NormalDist().inv_cdf(1 - alpha / 2)
+        name = self.predicted_mean.name or 'Price'
+        return pd.DataFrame({
+            f'lower {name}': self.predicted_mean - z * self.se_mean,
+            f'upper {name}': self.predicted_mean + z * self.se_mean,
+        }, index=self.predicted_mean.index)
+
+
+class CompactArimaModel:
+    """
+    Forecast-only ARIMA model rebuilt from its state-space representation.
+
+    Forecasts are computed by iterating the time-invariant system from the
+    last predicted state, which reproduces ARIMAResults.get_forecast().
+    """
+
+    engine = 'arima'
+    is_compact = True
+
+    def __init__(self, order, params, system, state, state_cov, last_observations,
+                 last_date, freq='D', nobs=0, aic=np.nan, bic=np.nan, name='Price'):
+        self.order = tuple(int(x) for x in order)
+        self.params = params
+        self.system = system
+        self.state = np.asarray(state, dtype=float)
+        self.state_cov = np.asarray(state_cov, dtype=float)
+        self.last_observations = np.asarray(last_observations, dtype=float)
+        self.last_date = pd.Timestamp(last_date)
+        self.freq = freq
+        self.nobs = int(nobs)
+        self.aic = float(aic)
+        self.bic = float(bic)
+        self.name = name
+
+    # ========== CONSTRUCTION ==========
+
+    @classmethod
+    def from_results(cls, results, tail_length=DEFAULT_TAIL_LENGTH):
+        """Build a compact model from fitted statsmodels ARIMAResults."""
+        filter_results = results.filter_results
+        system = {}
+        for matrix_name in SYSTEM_MATRICES:
+            matrix = np.asarray(getattr(filter_results, matrix_name))
+            # ARIMA without exog is time-invariant: keep the last (only) slice
+            system[matrix_name] = matrix[..., -1]
+
+        endog = np.asarray(results.model.endog, dtype=float).ravel()
+        dates = results.model._index
+        freq = getattr(dates, 'freqstr', None) or 'D'
+
+        return cls(
+            order=results.model.order,
+            params=pd.Series(results.params),
+            system=system,
+            state=filter_results.predicted_state[:, -1],
+            state_cov=filter_results.predicted_state_cov[:, :, -1],
+            last_observations=endog[-tail_length:],
+            last_date=dates[-1],
+            freq=freq,
+            nobs=results.nobs,
+            aic=results.aic,
+            bic=results.bic,
+            name=results.model.endog_names or 'Price',
+        )
+
+    # ========== FORECASTING ==========
+
+    def forecast_arrays(self, steps):
+        """Return (mean, variance) arrays for the next `steps` periods."""
+        design = self.system['design']
+        obs_intercept = self.system['obs_intercept']
+        obs_cov = self.system['obs_cov']
+        transition = self.system['transition']
+        state_intercept = self.system['state_intercept']
+        selection = self.system['selection']
+        state_noise = selection @ self.system['state_cov'] @ selection.T
+
+        state = self.state
+        state_cov = self.state_cov
+        mean = np.empty(steps)
+        variance = np.empty(steps)
+        for h in range(steps):
+            mean[h] = (design @ state + obs_intercept)[0]
+            variance[h] = (design @ state_cov @ design.T + obs_cov)[0, 0]
+            state = transition @ state + state_intercept
+            state_cov = transition @ state_cov @ transition.T + state_noise
+        return mean, variance
+
+    def forecast_index(self, steps):
+        """Dates of the next `steps` periods after the last observation."""
+        return pd.date_range(self.last_date, periods=steps + 1, freq=self.freq)[1:]
+
+    def get_forecast(self, steps=1):
+        """Forecast `steps` periods ahead (same contract as ARIMAResults)."""
+        mean, variance = self.forecast_arrays(steps)
+        predicted_mean = pd.Series(mean, index=self.forecast_index(steps), name=self.name)
+        return CompactForecast(predicted_mean, variance)
+
+    # ========== INCREMENTAL UPDATE ==========
+
+    def append(self, observations):
+        """
+        Extend the model with new consecutive observations, keeping the
+        estimated parameters (a Kalman filter update, like ARIMAResults.append
+        with refit=False). Attributes are replaced, never written in place, so
+        a shallow copy can be updated without touching the original.
+
+        Args:
+            observations: New prices for the periods following last_date
+
+        Returns:
+            ndarray: Standardized one-step-ahead forecast errors of the new observations
+        """
+        values = np.asarray(observations, dtype=float).ravel()
+        design = self.system['design']
+        obs_intercept = self.system['obs_intercept']
+        obs_cov = self.system['obs_cov']
+        transition = self.system['transition']
+        state_intercept = self.system['state_intercept']
+        selection = self.system['selection']
+        state_noise = selection @ self.system['state_cov'] @ selection.T
+
+        state = self.state
+        state_cov = self.state_cov
+        standardized_errors = np.empty(len(values))
+        for i, value in enumerate(values):
+            forecast_var = (design @ state_cov @ design.T + obs_cov)[0, 0]
+            error = value - (design @ state + obs_intercept)[0]
+            gain = (state_cov @ design.T)[:, 0] / forecast_var
+            filtered_state = state + gain * error
+            filtered_cov = state_cov - np.outer(gain, design @ state_cov)
+            state = transition @ filtered_state + state_intercept
+            state_cov = transition @ filtered_cov @ transition.T + state_noise
+            standardized_errors[i] = error / np.sqrt(forecast_var)
+
+        self.state = state
+        self.state_cov = state_cov
+        if len(values):
+            tail_length = max(len(self.last_observations), DEFAULT_TAIL_LENGTH)
+            self.last_observations = np.concatenate([self.last_observations, values])[-tail_length:]
+            self.last_date = self.forecast_index(len(values))[-1]
+            self.nobs += len(values)
+        return standardized_errors
+
+    # ========== SERIALIZATION ==========
+
+    def save(self, path):
+        """Write the model to a .npz file."""
+        arrays = {f'system_{name}': matrix for name, matrix in self.system.items()}
+        np.savez(
+            path,
+            order=np.array(self.order),
+            param_names=np.array(list(self.params.index), dtype=str),
+            param_values=self.params.to_numpy(dtype=float),
+            state=self.state,
+            state_cov=self.state_cov,
+            last_observations=self.last_observations,
+            last_date=np.array(self.last_date.isoformat()),
+            freq=np.array(self.freq),
+            nobs=np.array(self.nobs),
+            aic=np.array(self.aic),
+            bic=np.array(self.bic),
+            name=np.array(self.name),
+            **arrays,
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Read a model written by save()."""
+        with np.load(path, allow_pickle=False) as data:
+            system = {name: data[f'system_{name}'] for name in SYSTEM_MATRICES}
+            return cls(
+                order=data['order'],
+                params=pd.Series(data['param_values'], index=data['param_names'].tolist()),
+                system=system,
+                state=data['state'],
+                state_cov=data['state_cov'],
+                last_observations=data['last_observations'],
+                last_date=str(data['last_date']),
+                freq=str(data['freq']),
+                nobs=int(data['nobs']),
+                aic=float(data['aic']),
+                bic=float(data['bic']),
+                name=str(data['name']),
+            )
+
+
+def to_compact(model):
+    """Return a CompactArimaModel for a fitted results object (compact models pass through)."""
+    if getattr(model, 'is_compact', False):
+        return model
+    return CompactArimaModel.from_results(model)
+
+
+def convert_pickles(model_dir=None, remove_pickles=False):
+    """
+    Convert every pickled ARIMAResults in model_dir to the compact format.
+
+    Args:
+        model_dir (str): Directory with {market}_{commodity}.pkl files
+        remove_pickles (bool): Delete each pickle after a successful conversion
+
+    Returns:
+        list: Model keys that were converted
+    """
+    if model_dir is None:
+        model_dir = os.path.join(os.path.dirname(__file__), 'models')
+
+    converted = []
+    for pickle_path in sorted(glob.glob(os.path.join(model_dir, '*.pkl'))):
+        model_key = os.path.splitext(os.path.basename(pickle_path))[0]
+        if model_key == 'arima_params':
+            continue
+
+        with open(pickle_path, 'rb') as f:
+            results = pickle.load(f)
+
+        compact_path = os.path.join(model_dir, f"{model_key}.npz")
+        CompactArimaModel.from_results(results).save(compact_path)
+        converted.append(model_key)
+        logger.info(f"Converted {model_key}: {os.path.getsize(pickle_path) / 1024:.0f} KB -> "
+                    f"{os.path.getsize(compact_path) / 1024:.1f} KB")
+
+        if remove_pickles:
+            os.remove(pickle_path)
+
+    logger.info(f"Converted {len(converted)} models to compact format")
+    return converted
+
+
+if __name__ == "__main__":
+    convert_pickles(remove_pickles='--remove-pickles' in sys.argv[1:])
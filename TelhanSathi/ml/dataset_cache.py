@@ -0,0 +1,146 @@
+"""
+Columnar Dataset Cache for the ARIMA Price Forecaster
+Keeps a binary, pre-sorted copy of the price CSV (string columns stored as
+categorical codes, dates as int64) next to the CSV and rebuilds it only
+when the CSV's contents change
+"""
+
+import os
+import hashlib
+import tempfile
+import logging
+
+import numpy as np
+import pandas as pd
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CACHE_SUFFIX = '.columnar.npz'
+CATEGORICAL_COLUMNS = ('Market', 'Commodity')
+
+
+def default_cache_path(csv_path):
+    return os.path.splitext(csv_path)[0] + CACHE_SUFFIX
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_csv(csv_path):
+    """Parse and preprocess the CSV (the slow path the cache avoids)."""
+    df = pd.read_csv(csv_path)
+    df['Date'] = pd.to_datetime(df['Date'])
+    df = df.sort_values('Date').reset_index(drop=True)
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+    return df
+
+
+def write_cache(df, cache_path, source_stat, source_sha256):
+    """Write df column by column; categoricals as int codes plus categories."""
+    arrays = {
+        'meta_columns': np.array(list(df.columns), dtype=str),
+        'meta_source_size': np.array(source_stat.st_size),
+        'meta_source_mtime_ns': np.array(source_stat.st_mtime_ns),
+        'meta_source_sha256': np.array(source_sha256),
+    }
+    for i, column in enumerate(df.columns):
+        values = df[column]
+        if not isinstance(values.dtype, pd.CategoricalDtype) and (
+            values.dtype == object or pd.api.types.is_string_dtype(values)
+        ):
+            # Free-text columns (object or, on pandas >= 3, str dtype) are stored like
+            # categoricals (npz cannot hold objects without pickling)
+            values = values.astype('category')
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            arrays[f'col{i}_codes'] = values.cat.codes.to_numpy()
+            arrays[f'col{i}_categories'] = np.array(values.cat.categories.tolist(), dtype=str)
+        elif pd.api.types.is_datetime64_any_dtype(values):
+            arrays[f'col{i}_datetime'] = values.to_numpy(dtype='datetime64[ns]').view('int64')
+        else:
+            arrays[f'col{i}_values'] = values.to_numpy()
+
+    # Write to a uniquely named file next to the final path and rename, so readers
+    # never see a partial cache and concurrent rebuilds never share a temp file
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(cache_path) + '.', suffix='.tmp',
+                                    dir=os.path.dirname(os.path.abspath(cache_path)))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read_cache(data):
+    """Rebuild the DataFrame from an opened cache file."""
+    columns = {}
+    for i, column in enumerate(data['meta_columns'].tolist()):
+        if f'col{i}_codes' in data:
+            columns[column] = pd.Categorical.from_codes(
+                data[f'col{i}_codes'], categories=data[f'col{i}_categories'].tolist()
+            )
+        elif f'col{i}_datetime' in data:
+            columns[column] = data[f'col{i}_datetime'].view('datetime64[ns]')
+        else:
+            columns[column] = data[f'col{i}_values']
+    return pd.DataFrame(columns)
+
+
+def load_dataset(csv_path, cache_path=None):
+    """
+    Load the price dataset, using the columnar cache when it is valid.
+
+    The cache is valid when the CSV's size and mtime match; if only the
+    mtime changed, the CSV's SHA-256 decides (a touched or re-checked-out
+    file does not force a rebuild).
+
+    Args:
+        csv_path (str): Path to the CSV dataset
+        cache_path (str): Path of the cache file (defaults to next to the CSV)
+
+    Returns:
+        DataFrame: Dataset sorted by Date with categorical Market/Commodity
+    """
+    if cache_path is None:
+        cache_path = default_cache_path(csv_path)
+
+    stat = os.stat(csv_path)
+    source_sha256 = None
+
+    if os.path.exists(cache_path):
+        try:
+            with np.load(cache_path, allow_pickle=False) as data:
+                same_size = int(data['meta_source_size']) == stat.st_size
+                same_mtime = int(data['meta_source_mtime_ns']) == stat.st_mtime_ns
+                if same_size and same_mtime:
+                    return read_cache(data)
+                if same_size:
+                    source_sha256 = file_sha256(csv_path)
+                    if source_sha256 == str(data['meta_source_sha256']):
+                        df = read_cache(data)
+                        _try_write_cache(df, cache_path, stat, source_sha256)
+                        return df
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable dataset cache {cache_path}: {e}")
+
+    logger.info(f"Building columnar dataset cache from {csv_path}")
+    df = parse_csv(csv_path)
+    _try_write_cache(df, cache_path, stat, source_sha256 or file_sha256(csv_path))
+    return df
+
+
+def _try_write_cache(df, cache_path, source_stat, source_sha256):
+    try:
+        write_cache(df, cache_path, source_stat, source_sha256)
+    except OSError as e:
+        logger.warning(f"Could not write dataset cache {cache_path}: {e}")
@@ -0,0 +1,360 @@
+"""
+Lightweight Forecasting Engines
+Pure NumPy alternatives to statsmodels ARIMA - Holt's linear trend and
+AR on first differences - with closed-form forecast intervals and the
+same forecast contract as CompactArimaModel. The engine of each series
+is chosen through configuration
+"""
+
+import os
+import sys
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+
+# scipy.signal is imported only where the engines fit or forecast, so that
+# serving ARIMA models (and dispatching in load_model) never imports it
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Add ml directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from compact_models import CompactArimaModel, CompactForecast, DEFAULT_TAIL_LENGTH
+
+# Engine used for series without an explicit entry in the engine config
+DEFAULT_ENGINE = os.getenv('FORECAST_ENGINE', 'arima')
+# JSON file: {"default": "arima", "series": {"Surat_Sesame": "holt", ...}}
+DEFAULT_ENGINE_CONFIG = os.getenv(
+    'FORECAST_ENGINE_CONFIG',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'forecast_engines.json')
+)
+
+# Observations skipped when scoring in-sample errors (filter start-up)
+BURN_IN = 10
+
+
+def _gaussian_information_criteria(errors, n_params):
+    """(sigma2, aic, bic) of Gaussian one-step errors."""
+    n = len(errors)
+    sigma2 = float(np.mean(np.square(errors)))
+    log_likelihood = -0.5 * n * (np.log(2 * np.pi * sigma2) + 1)
+    return sigma2, -2 * log_likelihood + 2 * n_params, -2 * log_likelihood + np.log(n) * n_params
+
+
+class NumpyForecastModel:
+    """
+    Base class of the NumPy engines.
+
+    Subclasses implement fit(), forecast_arrays(steps) and _filter(values)
+    and keep their filter state in self.state (a dict of arrays), so that
+    forecasting, incremental updates and .npz serialization are shared.
+    """
+
+    engine = None
+    is_compact = True
+
+    def __init__(self, order, params, state, last_observations, last_date,
+                 freq='D', nobs=0, aic=np.nan, bic=np.nan, name='Price'):
+        self.order = tuple(int(x) for x in order)
+        self.params = params
+        self.state = {key: np.asarray(value, dtype=float) for key, value in state.items()}
+        self.last_observations = np.asarray(last_observations, dtype=float)
+        self.last_date = pd.Timestamp(last_date)
+        self.freq = freq
+        self.nobs = int(nobs)
+        self.aic = float(aic)
+        self.bic = float(bic)
+        self.name = name
+
+    @property
+    def sigma2(self):
+        return float(self.params['sigma2'])
+
+    # ========== FORECASTING ==========
+
+    def forecast_index(self, steps):
+        """Dates of the next `steps` periods after the last observation."""
+        return pd.date_range(self.last_date, periods=steps + 1, freq=self.freq)[1:]
+
+    def get_forecast(self, steps=1):
+        """Forecast `steps` periods ahead (same contract as ARIMAResults)."""
+        mean, variance = self.forecast_arrays(steps)
+        predicted_mean = pd.Series(mean, index=self.forecast_index(steps), name=self.name)
+        return CompactForecast(predicted_mean, variance)
+
+    # ========== INCREMENTAL UPDATE ==========
+
+    def append(self, observations):
+        """
+        Extend the model with new consecutive observations, keeping the
+        estimated parameters.
+
+        Returns:
+            ndarray: Standardized one-step-ahead forecast errors of the new observations
+        """
+        values = np.asarray(observations, dtype=float).ravel()
+        errors = self._filter(values)
+        if len(values):
+            tail_length = max(len(self.last_observations), DEFAULT_TAIL_LENGTH)
+            self.last_observations = np.concatenate([self.last_observations, values])[-tail_length:]
+            self.last_date = self.forecast_index(len(values))[-1]
+            self.nobs += len(values)
+        return errors / np.sqrt(self.sigma2)
+
+    # ========== SERIALIZATION ==========
+
+    def save(self, path):
+        """Write the model to a .npz file (readable by load_model)."""
+        np.savez(
+            path,
+            engine=np.array(self.engine),
+            order=np.array(self.order),
+            param_names=np.array(list(self.params.index), dtype=str),
+            param_values=self.params.to_numpy(dtype=float),
+            last_observations=self.last_observations,
+            last_date=np.array(self.last_date.isoformat()),
+            freq=np.array(self.freq),
+            nobs=np.array(self.nobs),
+            aic=np.array(self.aic),
+            bic=np.array(self.bic),
+            name=np.array(self.name),
+            **{f'state_{key}': value for key, value in self.state.items()},
+        )
+
+    @classmethod
+    def from_npz(cls, data):
+        return cls(
+            order=data['order'],
+            params=pd.Series(data['param_values'], index=data['param_names'].tolist()),
+            state={key[len('state_'):]: data[key] for key in data.files if key.startswith('state_')},
+            last_observations=data['last_observations'],
+            last_date=str(data['last_date']),
+            freq=str(data['freq']),
+            nobs=int(data['nobs']),
+            aic=float(data['aic']),
+            bic=float(data['bic']),
+            name=str(data['name']),
+        )
+
+    @classmethod
+    def _from_fit(cls, price_series, order, params, state, errors, n_params):
+        sigma2, aic, bic = _gaussian_information_criteria(errors[BURN_IN:], n_params)
+        params = pd.Series({**params, 'sigma2': sigma2})
+        dates = price_series.index
+        return cls(
+            order=order,
+            params=params,
+            state=state,
+            last_observations=price_series.to_numpy(dtype=float)[-DEFAULT_TAIL_LENGTH:],
+            last_date=dates[-1],
+            freq=getattr(dates, 'freqstr', None) or 'D',
+            nobs=len(price_series),
+            aic=aic,
+            bic=bic,
+            name=price_series.name or 'Price',
+        )
+
+
+class HoltModel(NumpyForecastModel):
+    """
+    Holt's linear trend (additive error ETS(A,A,N)).
+
+    Smoothing parameters are chosen on a grid by one-step squared error,
+    scoring every candidate with the equivalent ARIMA(0,2,2) filter
+    (scipy.signal.lfilter) instead of a Python loop over observations.
+    """
+
+    engine = 'holt'
+    ALPHAS = np.linspace(0.05, 1.0, 20)
+    BETAS = np.array([0.001, 0.01, 0.02, 0.05, 0.1, 0.2, 0.3, 0.5])
+
+    @classmethod
+    def fit(cls, price_series, order=None):
+        from scipy.signal import lfilter
+
+        values = price_series.to_numpy(dtype=float)
+        second_differences = np.diff(values, n=2)
+
+        best = (np.inf, 1.0, 0.1)
+        for alpha in cls.ALPHAS:
+            for beta in cls.BETAS:
+                # (1-B)^2 y_t = (1 + theta1 B + theta2 B^2) e_t
+                theta1 = alpha + alpha * beta - 2
+                theta2 = 1 - alpha
+                errors = lfilter([1.0], [1.0, theta1, theta2], second_differences)
+                sse = float(np.dot(errors[BURN_IN:], errors[BURN_IN:]))
+                if sse < best[0]:
+                    best = (sse, alpha, beta)
+        _, alpha, beta = best
+
+        model = cls(order=(0, 2, 2), params=pd.Series({'alpha': alpha, 'beta': beta, 'sigma2': 1.0}),
+                    state={'level': values[0], 'trend': values[1] - values[0]},
+                    last_observations=[], last_date=price_series.index[0])
+        errors = model._filter(values[1:])
+        return cls._from_fit(price_series, (0, 2, 2), {'alpha': alpha, 'beta': beta},
+                             model.state, errors, n_params=4), errors
+
+    def _filter(self, values):
+        alpha = float(self.params['alpha'])
+        beta = float(self.params['beta'])
+        level = float(self.state['level'])
+        trend = float(self.state['trend'])
+        errors = np.empty(len(values))
+        for i, value in enumerate(values):
+            forecast = level + trend
+            error = value - forecast
+            level = forecast + alpha * error
+            trend = trend + alpha * beta * error
+            errors[i] = error
+        self.state = {'level': np.asarray(level), 'trend': np.asarray(trend)}
+        return errors
+
+    def forecast_arrays(self, steps):
+        """Return (mean, variance) arrays for the next `steps` periods."""
+        alpha = float(self.params['alpha'])
+        beta = float(self.params['beta'])
+        h = np.arange(1, steps + 1)
+        mean = float(self.state['level']) + h * float(self.state['trend'])
+        # var_h = sigma2 * (1 + sum_{j=1}^{h-1} (alpha * (1 + j * beta))^2)
+        weights = np.square(alpha * (1 + np.arange(1, steps) * beta))
+        variance = self.sigma2 * (1 + np.concatenate([[0.0], np.cumsum(weights)]))
+        return mean, variance
+
+
+class ARModel(NumpyForecastModel):
+    """
+    AR(p) with intercept on first differences (ARIMA(p,1,0)), fitted by
+    least squares. Forecast means and psi-weights come from lfilter, so
+    neither fitting nor forecasting loops in Python.
+    """
+
+    engine = 'ar'
+    MAX_P = 5
+
+    @staticmethod
+    def _design(differences, p, start):
+        lags = [differences[start - i:len(differences) - i] for i in range(1, p + 1)]
+        return np.column_stack([np.ones(len(differences) - start)] + lags)
+
+    @classmethod
+    def fit(cls, price_series, order=None):
+        values = price_series.to_numpy(dtype=float)
+        differences = np.diff(values)
+
+        if order is not None and order[0] > 0:
+            p = int(order[0])
+        else:
+            # Choose p by AIC on a common sample
+            best = (np.inf, 1)
+            target = differences[cls.MAX_P:]
+            for candidate in range(1, cls.MAX_P + 1):
+                X = cls._design(differences, candidate, cls.MAX_P)
+                coefficients = np.linalg.lstsq(X, target, rcond=None)[0]
+                _, aic, _ = _gaussian_information_criteria(target - X @ coefficients, candidate + 2)
+                if aic < best[0]:
+                    best = (aic, candidate)
+            p = best[1]
+
+        X = cls._design(differences, p, p)
+        coefficients = np.linalg.lstsq(X, differences[p:], rcond=None)[0]
+        errors = differences[p:] - X @ coefficients
+
+        params = {'const': coefficients[0]}
+        params.update({f'ar.L{i}': coefficients[i] for i in range(1, p + 1)})
+        state = {'last_level': values[-1], 'last_differences': differences[-p:]}
+        return cls._from_fit(price_series, (p, 1, 0), params, state, errors, n_params=p + 2), errors
+
+    @property
+    def ar_coefficients(self):
+        return np.array([self.params[f'ar.L{i}'] for i in range(1, self.order[0] + 1)])
+
+    def _filter(self, values):
+        const = float(self.params['const'])
+        phi = self.ar_coefficients
+        level = float(self.state['last_level'])
+        recent = list(self.state['last_differences'])
+        errors = np.empty(len(values))
+        for i, value in enumerate(values):
+            difference = value - level
+            errors[i] = difference - (const + np.dot(phi, recent[::-1]))
+            recent = recent[1:] + [difference]
+            level = value
+        self.state = {'last_level': np.asarray(level), 'last_differences': np.asarray(recent)}
+        return errors
+
+    def forecast_arrays(self, steps):
+        """Return (mean, variance) arrays for the next `steps` periods."""
+        from scipy.signal import lfilter, lfiltic
+
+        const = float(self.params['const'])
+        ar_polynomial = np.concatenate([[1.0], -self.ar_coefficients])
+
+        # Differences: x_h = const + sum phi_i x_{h-i}, started from the last observed differences
+        initial = lfiltic([1.0], ar_polynomial, y=self.state['last_differences'][::-1])
+        difference_mean, _ = lfilter([1.0], ar_polynomial, np.full(steps, const), zi=initial)
+        mean = float(self.state['last_level']) + np.cumsum(difference_mean)
+
+        # Level error at h is sum_{j<h} (psi_0 + ... + psi_j) e_{t+h-j}
+        impulse = np.zeros(steps)
+        impulse[0] = 1.0
+        psi = lfilter([1.0], ar_polynomial, impulse)
+        variance = self.sigma2 * np.cumsum(np.square(np.cumsum(psi)))
+        return mean, variance
+
+
+ENGINES = {
+    'holt': HoltModel,
+    'ar': ARModel,
+}
+ENGINE_NAMES = ('arima',) + tuple(ENGINES)
+
+
+def fit_engine(engine, price_series, order=None):
+    """
+    Fit a NumPy engine on a daily price series.
+
+    Returns:
+        tuple: (model, in-sample one-step errors)
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown forecasting engine '{engine}'. Available: {list(ENGINE_NAMES)}")
+    return ENGINES[engine].fit(price_series, order=order)
+
+
+def load_model(path):
+    """Read any compact model file (ARIMA or NumPy engine) written by save()."""
+    with np.load(path, allow_pickle=False) as data:
+        engine = str(data['engine']) if 'engine' in data.files else 'arima'
+        if engine == 'arima':
+            return CompactArimaModel.load(path)
+        return ENGINES[engine].from_npz(data)
+
+
+def load_engine_config(path=None):
+    """
+    Read the per-series engine configuration.
+
+    Returns:
+        dict: {'default': engine name, 'series': {model_key: engine name}}
+    """
+    if path is None:
+        path = DEFAULT_ENGINE_CONFIG
+
+    config = {'default': DEFAULT_ENGINE, 'series': {}}
+    if path and os.path.exists(path):
+        with open(path) as f:
+            config.update(json.load(f))
+
+    for engine in [config['default'], *config['series'].values()]:
+        if engine not in ENGINE_NAMES:
+            raise ValueError(f"Unknown forecasting engine '{engine}' in {path}")
+    return config
+
+
+def engine_for(model_key, config):
+    """Engine configured for a series."""
+    return config['series'].get(model_key, config['default'])
@@ -0,0 +1,271 @@
+"""
+Precomputed Forecast Tensor
+Daily batch stage that writes the forecasts of every market-commodity
+model into one float32 array [series x horizon x {mean, lower, upper}]
+which request handlers read through a read-only memory map
+
+Every build writes its tensor under a new name and then atomically replaces
+the index, which names that tensor file; a reader always gets a tensor and
+index from the same build.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import hashlib
+import tempfile
+import logging
+from datetime import datetime
+
+import numpy as np
+
+from model_registry import link_or_copy
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TENSOR_FILENAME = 'forecast_tensor.npy'  # Indexes without 'tensor_file' (older builds)
+TENSOR_PREFIX = 'forecast_tensor-'
+INDEX_FILENAME = 'forecast_index.json'
+FIELDS = ('mean', 'lower', 'upper')
+# Unindexed tensors left by concurrent builds are removed once this old
+ORPHAN_TENSOR_SECONDS = 60 * 60
+DEFAULT_HORIZON = 90
+
+
+def models_fingerprint(forecaster):
+    """
+    Fingerprint of the models a tensor was built from.
+    Changes whenever models are retrained or parameters change.
+    """
+    return fingerprint_models(forecaster.arima_params, forecaster.models)
+
+
+def fingerprint_models(arima_params, models):
+    """models_fingerprint for a parameter dict and LazyModelStore not (yet) owned by a forecaster."""
+    digest = hashlib.sha1()
+    for model_key in sorted(arima_params):
+        digest.update(f"{model_key}:{arima_params[model_key]}".encode())
+        model_path = models.model_path(model_key)
+        if os.path.exists(model_path):
+            stat = os.stat(model_path)
+            digest.update(f":{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()
+
+
+def build_forecast_tensor(forecaster, horizon=DEFAULT_HORIZON, alpha=0.05, output_dir=None):
+    """
+    Forecast every trained series and write the tensor plus its key index.
+
+    Args:
+        forecaster: ArimaPriceForecaster with models loaded
+        horizon (int): Number of days forecast per series
+        alpha (float): Significance level of the confidence interval
+        output_dir (str): Directory for the .npy/.json files (defaults to the
+            forecaster's active model directory)
+
+    Returns:
+        str: Path of the written tensor
+    """
+    if output_dir is None:
+        output_dir = forecaster.active_model_dir
+
+    keys = []
+    last_prices = []
+    engines = {}
+    rows = []
+    for model_key in sorted(forecaster.arima_params):
+        if model_key not in forecaster.models:
+            continue
+        market, commodity = model_key.split('_', 1)
+
+        model = forecaster.models[model_key]
+        forecast_result = model.get_forecast(steps=horizon)
+        conf_int = forecast_result.conf_int(alpha=alpha)
+        rows.append(np.column_stack([
+            np.asarray(forecast_result.predicted_mean, dtype=float),
+            conf_int.iloc[:, 0].to_numpy(dtype=float),
+            conf_int.iloc[:, 1].to_numpy(dtype=float),
+        ]))
+        keys.append(model_key)
+        engines[model_key] = getattr(model, 'engine', 'arima')
+        last_prices.append(float(forecaster._get_time_series_data(market, commodity).iloc[-1]))
+
+    tensor = np.stack(rows).astype(np.float32) if rows else np.zeros((0, horizon, len(FIELDS)), np.float32)
+
+    # The tensor gets a name of its own (never overwritten); replacing the index
+    # last publishes tensor and index as one unit
+    tensor_file = f"{TENSOR_PREFIX}{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}.npy"
+    tensor_path = os.path.join(output_dir, tensor_file)
+    index_path = os.path.join(output_dir, INDEX_FILENAME)
+    previous_file = _indexed_tensor_file(index_path)
+
+    _write_atomic(tensor_path, 'wb', lambda f: np.save(f, tensor))
+    _write_atomic(index_path, 'w', lambda f: json.dump({
+        'tensor_file': tensor_file,
+        'keys': keys,
+        'fields': list(FIELDS),
+        'horizon': horizon,
+        'alpha': alpha,
+        'last_prices': last_prices,
+        'engines': engines,
+        'models_fingerprint': models_fingerprint(forecaster),
+        'generated_at': datetime.utcnow().isoformat(),
+    }, f, indent=2))
+
+    # Processes that mapped the old tensor keep their mapping
+    _remove_old_tensors(output_dir, previous_file, tensor_file)
+
+    logger.info(f"Forecast tensor written: {tensor.shape} -> {tensor_path}")
+    return tensor_path
+
+
+def _write_atomic(path, mode, write):
+    """Write through a uniquely named temporary file in the same directory and os.replace it."""
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp',
+                                    dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, mode) as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _remove_old_tensors(directory, previous_file, tensor_file):
+    """Remove the tensor the index named before this build, and orphans of concurrent builds."""
+    now = time.time()
+    for name in os.listdir(directory):
+        if name == tensor_file or not (name == TENSOR_FILENAME or name.startswith(TENSOR_PREFIX)):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            if name == previous_file or now - os.path.getmtime(path) > ORPHAN_TENSOR_SECONDS:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _indexed_tensor_file(index_path):
+    """Tensor file named by an existing index (None if there is no index)."""
+    try:
+        with open(index_path) as f:
+            return json.load(f).get('tensor_file', TENSOR_FILENAME)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def publish_forecast_tensor(forecaster, horizon=DEFAULT_HORIZON, alpha=0.05):
+    """
+    Build the tensor for the active models and publish it as a new registry
+    version (the model files are hard-linked), so running processes pick it
+    up through their hot-reload watcher.
+
+    The tensor is forecast from the in-memory models while the version links
+    the files on disk, so both must agree: unsaved models (incremental
+    updates or fresh training) have to be published with save_models() first.
+
+    Returns:
+        str: The published version
+
+    Raises:
+        ValueError: If the forecaster holds unsaved models
+    """
+    unsaved = [model_key for model_key, _ in forecaster.models.unsaved_items()]
+    if unsaved:
+        raise ValueError(f"Unsaved models ({', '.join(unsaved)}): call save_models() before "
+                         f"publishing a forecast tensor")
+
+    registry = forecaster.registry
+    staging_dir = registry.stage()
+    try:
+        for name in os.listdir(forecaster.active_model_dir):
+            path = os.path.join(forecaster.active_model_dir, name)
+            if os.path.isfile(path) and (name.endswith(('.npz', '.pkl')) or name == 'arima_params.pkl'):
+                link_or_copy(path, os.path.join(staging_dir, name))
+        build_forecast_tensor(forecaster, horizon=horizon, alpha=alpha, output_dir=staging_dir)
+        version = registry.publish(staging_dir, metadata={'forecast_horizon': horizon, 'alpha': alpha})
+    except Exception:
+        registry.discard(staging_dir)
+        raise
+    forecaster.reload_models(version)
+    return version
+
+
+class ForecastTensor:
+    """Read-only, memory-mapped view of a precomputed forecast tensor."""
+
+    def __init__(self, tensor, index):
+        self.tensor = tensor
+        self.keys = index['keys']
+        self.horizon = int(index['horizon'])
+        self.alpha = index.get('alpha', 0.05)
+        self.models_fingerprint = index.get('models_fingerprint')
+        self.generated_at = index.get('generated_at')
+        self._rows = {model_key: i for i, model_key in enumerate(self.keys)}
+        self._last_prices = dict(zip(self.keys, index.get('last_prices', [])))
+        self._engines = index.get('engines', {})
+
+    @classmethod
+    def load(cls, directory):
+        """
+        Memory-map the tensor in `directory` named by its index, or return
+        None if it was never built or the files do not match.
+        """
+        index_path = os.path.join(directory, INDEX_FILENAME)
+        # A rebuild may remove the indexed tensor between reading the index and mapping it
+        for _ in range(2):
+            try:
+                with open(index_path) as f:
+                    index = json.load(f)
+                tensor = np.load(os.path.join(directory, index.get('tensor_file', TENSOR_FILENAME)), mmap_mode='r')
+            except FileNotFoundError:
+                continue
+            if tensor.shape != (len(index['keys']), int(index['horizon']), len(FIELDS)):
+                logger.warning(f"Forecast tensor in {directory} does not match its index - ignoring it")
+                return None
+            return cls(tensor, index)
+        return None
+
+    def __contains__(self, model_key):
+        return model_key in self._rows
+
+    def covers(self, model_key, periods):
+        """Whether the tensor can answer a forecast of `periods` days for a key."""
+        return model_key in self._rows and periods <= self.horizon
+
+    def slice(self, model_key, periods):
+        """
+        Return (mean, lower, upper) float32 views for the first `periods` days.
+        No data is copied; pages are shared by every process mapping the file.
+        """
+        series = self.tensor[self._rows[model_key], :periods]
+        return series[:, 0], series[:, 1], series[:, 2]
+
+    def last_price(self, model_key):
+        return self._last_prices.get(model_key)
+
+    def engine(self, model_key):
+        """Forecasting engine of the model a series was built from (None for older tensors)."""
+        return self._engines.get(model_key)
+
+    def gather(self, model_keys, periods):
+        """
+        Return a [len(model_keys) x periods x 3] float32 array for many series
+        with a single fancy-indexing read.
+        """
+        rows = [self._rows[model_key] for model_key in model_keys]
+        return self.tensor[rows, :periods]
+
+
+if __name__ == "__main__":
+    # Daily batch stage: python forecast_tensor.py [horizon]
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from arima_price_forecaster import get_forecaster
+
+    publish_forecast_tensor(get_forecaster(),
+                            horizon=int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_HORIZON)
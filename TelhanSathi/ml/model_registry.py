@@ -0,0 +1,278 @@
+"""
+Versioned Model Registry
+Every published set of models lives in its own immutable directory
+(ml/models/versions/<version>/) next to a manifest with SHA-256 checksums.
+The active version is named by the CURRENT pointer file, which is swapped
+atomically with os.replace, so readers see either the old or the new set and
+never a half-written one. Older versions are kept for instant rollback.
+"""
+
+import os
+import sys
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+import argparse
+import logging
+from datetime import datetime
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+VERSIONS_DIRNAME = 'versions'
+POINTER_FILENAME = 'CURRENT'
+MANIFEST_FILENAME = 'manifest.json'
+STAGING_PREFIX = '.staging-'
+# Published versions kept on disk (the active one is never removed)
+DEFAULT_KEEP_VERSIONS = int(os.getenv('MODEL_KEEP_VERSIONS', 5))
+# How often running processes check the pointer for a newly published version
+DEFAULT_RELOAD_INTERVAL = float(os.getenv('MODEL_RELOAD_INTERVAL', 30))
+
+
+def file_checksum(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def link_or_copy(source, destination):
+    """Hard-link an unchanged file into a new version (copy across filesystems)."""
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+
+
+def _write_atomic(path, text):
+    """Write a small text file via a temporary file and os.replace."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class ModelRegistry:
+    """
+    Versioned directories of trained models under one root.
+
+    Publishing: write a full model set into stage(), then publish() it;
+    the manifest is written, the staging directory renamed into place and
+    the pointer swapped. Without any published version (the original flat
+    ml/models layout) the root directory itself is the active one.
+    """
+
+    def __init__(self, root, keep_versions=None):
+        """
+        Initialize the registry.
+
+        Args:
+            root (str): Model directory (holds CURRENT and versions/)
+            keep_versions (int): Published versions kept on disk
+        """
+        self.root = root
+        self.versions_dir = os.path.join(root, VERSIONS_DIRNAME)
+        self.pointer_path = os.path.join(root, POINTER_FILENAME)
+        self.keep_versions = max(1, keep_versions if keep_versions is not None else DEFAULT_KEEP_VERSIONS)
+
+    # ========== LOOKUP ==========
+
+    def current_version(self):
+        """Name of the active version, or None for the flat (unversioned) layout."""
+        try:
+            with open(self.pointer_path) as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return version or None
+
+    def version_dir(self, version):
+        return os.path.join(self.versions_dir, version)
+
+    def active_dir(self):
+        """Directory the active models are read from."""
+        version = self.current_version()
+        return self.version_dir(version) if version else self.root
+
+    def versions(self):
+        """Published versions, oldest first."""
+        if not os.path.isdir(self.versions_dir):
+            return []
+        return sorted(
+            name for name in os.listdir(self.versions_dir)
+            if not name.startswith('.') and os.path.exists(os.path.join(self.versions_dir, name, MANIFEST_FILENAME))
+        )
+
+    def manifest(self, version):
+        with open(os.path.join(self.version_dir(version), MANIFEST_FILENAME)) as f:
+            return json.load(f)
+
+    # ========== PUBLISHING ==========
+
+    def stage(self):
+        """Create an empty staging directory for a new version."""
+        os.makedirs(self.versions_dir, exist_ok=True)
+        return tempfile.mkdtemp(prefix=STAGING_PREFIX, dir=self.versions_dir)
+
+    def publish(self, staging_dir, metadata=None, activate=True):
+        """
+        Turn a staging directory into a published version.
+
+        Args:
+            staging_dir (str): Directory returned by stage(), fully written
+            metadata (dict): Extra fields stored in the manifest
+            activate (bool): Swap the pointer to the new version
+
+        Returns:
+            str: The new version name (the existing one if identical files
+                were already published in the same second)
+        """
+        files = {}
+        for name in sorted(os.listdir(staging_dir)):
+            path = os.path.join(staging_dir, name)
+            if os.path.isfile(path) and name != MANIFEST_FILENAME:
+                files[name] = {'sha256': file_checksum(path), 'bytes': os.path.getsize(path)}
+
+        content_hash = hashlib.sha256(
+            json.dumps({name: info['sha256'] for name, info in files.items()}, sort_keys=True).encode()
+        ).hexdigest()
+        version = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{content_hash[:8]}"
+
+        manifest = {
+            'version': version,
+            'created_at': datetime.utcnow().isoformat(),
+            'parent': self.current_version(),
+            'files': files,
+            **(metadata or {}),
+        }
+        _write_atomic(os.path.join(staging_dir, MANIFEST_FILENAME), json.dumps(manifest, indent=2))
+
+        # A directory rename is atomic: the version appears complete or not at all.
+        # The name ends in a hash of the files, so an existing directory of the
+        # same name (same second, same content) already is this version.
+        try:
+            os.rename(staging_dir, self.version_dir(version))
+            logger.info(f"Model version published: {version} ({len(files)} files)")
+        except OSError:
+            if not os.path.exists(os.path.join(self.version_dir(version), MANIFEST_FILENAME)):
+                raise
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            logger.info(f"Model version {version} already published")
+
+        if activate:
+            self.activate(version)
+        self.prune()
+        return version
+
+    def verify(self, version):
+        """
+        Check every file of a version against its manifest.
+
+        Raises:
+            ValueError: If a file is missing or its checksum does not match
+        """
+        directory = self.version_dir(version)
+        for name, info in self.manifest(version)['files'].items():
+            path = os.path.join(directory, name)
+            if not os.path.exists(path):
+                raise ValueError(f"Model version {version}: missing file {name}")
+            if file_checksum(path) != info['sha256']:
+                raise ValueError(f"Model version {version}: checksum mismatch for {name}")
+
+    def activate(self, version):
+        """Verify a version and make it the active one (atomic pointer swap)."""
+        self.verify(version)
+        _write_atomic(self.pointer_path, version + '\n')
+        logger.info(f"Active model version: {version}")
+
+    def rollback(self, version=None):
+        """
+        Re-activate an earlier version (default: the one before the active version).
+
+        Returns:
+            str: The version now active
+        """
+        if version is None:
+            versions = self.versions()
+            current = self.current_version()
+            earlier = versions[:versions.index(current)] if current in versions else versions[:-1]
+            if not earlier:
+                raise ValueError('No earlier model version to roll back to')
+            version = earlier[-1]
+        self.activate(version)
+        return version
+
+    def prune(self):
+        """Delete the oldest versions beyond keep_versions (never the active one)."""
+        current = self.current_version()
+        versions = self.versions()
+        for version in versions[:max(0, len(versions) - self.keep_versions)]:
+            if version != current:
+                shutil.rmtree(self.version_dir(version), ignore_errors=True)
+                logger.info(f"Model version pruned: {version}")
+
+    def discard(self, staging_dir):
+        """Remove a staging directory after a failed publish."""
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+class RegistryWatcher(threading.Thread):
+    """
+    Background thread that polls the registry pointer and calls
+    on_change(version) whenever another process publishes or rolls back.
+    """
+
+    def __init__(self, registry, on_change, interval=None):
+        super().__init__(name='model-registry-watcher', daemon=True)
+        self.registry = registry
+        self.on_change = on_change
+        self.interval = interval if interval is not None else DEFAULT_RELOAD_INTERVAL
+        self.last_version = registry.current_version()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            version = self.registry.current_version()
+            if version == self.last_version:
+                continue
+            try:
+                self.on_change(version)
+                self.last_version = version
+            except Exception as e:
+                # Keep serving the loaded version; the swap is retried on the next poll
+                logger.error(f"Hot reload of model version {version} failed: {e}")
+
+    def stop(self):
+        self._stop_event.set()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Inspect and switch published model versions')
+    parser.add_argument('command', choices=['list', 'verify', 'activate', 'rollback'])
+    parser.add_argument('version', nargs='?')
+    parser.add_argument('--model-dir', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models'))
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.model_dir)
+    if args.command == 'list':
+        current = registry.current_version()
+        for name in registry.versions():
+            manifest = registry.manifest(name)
+            marker = '*' if name == current else ' '
+            print(f"{marker} {name}  {manifest['created_at']}  {len(manifest['files'])} files")
+    elif args.command == 'verify':
+        for name in [args.version] if args.version else registry.versions():
+            registry.verify(name)
+            print(f"{name}: OK")
+    elif args.command == 'activate':
+        if not args.version:
+            sys.exit('activate needs a version')
+        registry.activate(args.version)
+    else:
+        print(registry.rollback(args.version))
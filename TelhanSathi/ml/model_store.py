@@ -0,0 +1,291 @@
+"""
+Lazy Model Store for ARIMA Price Forecaster
+Loads {market}_{commodity} models from disk on first use and keeps
+a bounded number of them in memory (LRU by count and by bytes)
+"""
+
+import os
+import sys
+import pickle
+import threading
+import logging
+from collections import OrderedDict
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Add ml directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from forecast_engines import load_model
+
+# Defaults can be overridden per deployment through the environment
+DEFAULT_MAX_MODELS = int(os.getenv('ARIMA_MODEL_CACHE_SIZE', 8))
+DEFAULT_MAX_BYTES = int(os.getenv('ARIMA_MODEL_CACHE_BYTES', 32 * 1024 * 1024))
+
+
+class LazyModelStore:
+    """
+    Dict-like store of trained models that loads a model the first
+    time it is requested and evicts the least recently used ones once
+    either the model count or the byte budget is exceeded.
+
+    Compact .npz models are preferred over pickled ARIMAResults when both
+    exist. Byte sizes are estimated from the size of the model file on
+    disk. Models put into the store after training are kept until they
+    have been saved. Disk reads happen outside the store lock, so a cold
+    load never blocks lookups of other keys; concurrent misses of the same
+    key wait for a single load.
+    """
+
+    def __init__(self, model_dir, max_models=None, max_bytes=None):
+        """
+        Initialize the store.
+
+        Args:
+            model_dir (str): Directory holding the {model_key}.npz/.pkl files
+            max_models (int): Maximum number of models kept in memory
+            max_bytes (int): Maximum estimated bytes kept in memory
+        """
+        self.model_dir = model_dir
+        self.max_models = max_models if max_models is not None else DEFAULT_MAX_MODELS
+        self.max_bytes = max_bytes if max_bytes is not None else DEFAULT_MAX_BYTES
+
+        self._known_keys = set()          # Keys that can be loaded from disk
+        self._cache = OrderedDict()       # model_key -> (model, size_bytes)
+        self._unsaved = set()             # Trained models not yet written to disk
+        self._current_bytes = 0
+        self._loading = {}                # model_key -> Event set when its load finishes
+        self._lock = threading.RLock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ========== REGISTRATION ==========
+
+    def register(self, model_key):
+        """Mark a model as available on disk without loading it."""
+        with self._lock:
+            self._known_keys.add(model_key)
+
+    def compact_path(self, model_key):
+        """Path of the compact (.npz) model for a key."""
+        return os.path.join(self.model_dir, f"{model_key}.npz")
+
+    def pickle_path(self, model_key):
+        """Path of the pickled ARIMAResults for a key (model dirs not yet converted to .npz)."""
+        return os.path.join(self.model_dir, f"{model_key}.pkl")
+
+    def model_path(self, model_key):
+        """Path the model is loaded from (compact format preferred)."""
+        compact_path = self.compact_path(model_key)
+        pickle_path = self.pickle_path(model_key)
+        if not os.path.exists(compact_path) and os.path.exists(pickle_path):
+            return pickle_path
+        return compact_path
+
+    # ========== DICT INTERFACE ==========
+
+    def __contains__(self, model_key):
+        with self._lock:
+            return model_key in self._cache or model_key in self._known_keys
+
+    def __getitem__(self, model_key):
+        model = self.get(model_key)
+        if model is None:
+            raise KeyError(model_key)
+        return model
+
+    def __setitem__(self, model_key, model):
+        """Store a freshly trained model (never evicted before it is saved)."""
+        self.put(model_key, model, unsaved=True)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._known_keys | set(self._cache))
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def keys(self):
+        with self._lock:
+            return sorted(self._known_keys | set(self._cache))
+
+    def items(self):
+        """Iterate over (model_key, model) pairs, loading models as needed."""
+        for model_key in self.keys():
+            model = self.get(model_key)
+            if model is not None:
+                yield model_key, model
+
+    def loaded_items(self):
+        """Return (model_key, model) pairs currently held in memory."""
+        with self._lock:
+            return [(model_key, entry[0]) for model_key, entry in self._cache.items()]
+
+    # ========== LOADING & EVICTION ==========
+
+    def get(self, model_key, default=None):
+        """Return a model, reading it from disk on a cache miss."""
+        while True:
+            with self._lock:
+                if model_key in self._cache:
+                    self._cache.move_to_end(model_key)
+                    self.hits += 1
+                    return self._cache[model_key][0]
+
+                if model_key not in self._known_keys:
+                    return default
+
+                loading = self._loading.get(model_key)
+                if loading is None:
+                    self.misses += 1
+                    loading = self._loading[model_key] = threading.Event()
+                    break
+            # Another thread is reading this model: wait, then look again
+            loading.wait()
+
+        try:
+            return self._load(model_key, default)
+        finally:
+            with self._lock:
+                del self._loading[model_key]
+            loading.set()
+
+    def _load(self, model_key, default):
+        """Read a model from disk (without holding the lock) and insert it."""
+        model_path = self.model_path(model_key)
+        if not os.path.exists(model_path):
+            logger.error(f"Model file missing: {model_path}")
+            return default
+
+        if model_path.endswith('.npz'):
+            model = load_model(model_path)
+        else:
+            with open(model_path, 'rb') as f:
+                model = pickle.load(f)
+        size_bytes = os.path.getsize(model_path)
+
+        with self._lock:
+            if model_key in self._cache:
+                # Put by training while the file was read: that model is newer
+                return self._cache[model_key][0]
+            self._insert(model_key, model, size_bytes)
+        logger.info(f"Model loaded on demand: {model_key}")
+        return model
+
+    def put(self, model_key, model, size_bytes=None, unsaved=False):
+        """Insert a model that is already in memory."""
+        if size_bytes is None:
+            size_bytes = self._estimate_size(model_key, model)
+        with self._lock:
+            self._known_keys.add(model_key)
+            if unsaved:
+                self._unsaved.add(model_key)
+            self._insert(model_key, model, size_bytes)
+
+    def unsaved_items(self):
+        """Return (model_key, model) pairs put into the store but not yet written to disk."""
+        with self._lock:
+            return [(model_key, self._cache[model_key][0]) for model_key in sorted(self._unsaved)]
+
+    def mark_saved(self, model_key):
+        """Allow a model to be evicted once it has been written to disk."""
+        with self._lock:
+            self._unsaved.discard(model_key)
+            self._evict()
+
+    def _insert(self, model_key, model, size_bytes):
+        if model_key in self._cache:
+            self._current_bytes -= self._cache.pop(model_key)[1]
+        self._cache[model_key] = (model, size_bytes)
+        self._current_bytes += size_bytes
+        self._evict()
+
+    def _evict(self):
+        """Drop least recently used models until both limits are met (always keep one)."""
+        candidates = [key for key in self._cache if key not in self._unsaved]
+        for model_key in candidates:
+            if len(self._cache) <= 1 or (
+                len(self._cache) <= self.max_models and self._current_bytes <= self.max_bytes
+            ):
+                break
+            _, size_bytes = self._cache.pop(model_key)
+            self._current_bytes -= size_bytes
+            self.evictions += 1
+            logger.debug(f"Model evicted: {model_key}")
+
+    def _estimate_size(self, model_key, model):
+        model_path = self.model_path(model_key)
+        if os.path.exists(model_path):
+            return os.path.getsize(model_path)
+        return len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def preload_all(self, read_only=True):
+        """
+        Load every known model and keep all of them in memory (the LRU limits
+        are raised to fit). Used before forking workers: with read_only the
+        models' arrays are marked non-writeable, so the shared pages are never
+        copied (incremental updates replace arrays rather than writing to them).
+
+        Returns:
+            int: Number of models in memory
+        """
+        with self._lock:
+            max_bytes = self.max_bytes
+            self.max_models = max(self.max_models, len(self._known_keys | set(self._cache)))
+            self.max_bytes = float('inf')
+            model_keys = sorted(self._known_keys)
+        # Not under the lock: get() may wait for loads started by other threads
+        for model_key in model_keys:
+            self.get(model_key)
+        with self._lock:
+            self.max_bytes = max(max_bytes, self._current_bytes)
+            if read_only:
+                for model, _ in self._cache.values():
+                    if getattr(model, 'is_compact', False):
+                        _freeze_arrays(model)
+            return len(self._cache)
+
+    def is_loaded(self, model_key):
+        """Whether a model is currently held in memory."""
+        with self._lock:
+            return model_key in self._cache
+
+    def clear(self):
+        """Forget all models and registrations."""
+        with self._lock:
+            self._known_keys.clear()
+            self._cache.clear()
+            self._unsaved.clear()
+            self._current_bytes = 0
+
+    # ========== METRICS ==========
+
+    def stats(self):
+        """Return cache counters for monitoring."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'loaded_models': len(self._cache),
+                'known_models': len(self._known_keys | set(self._cache)),
+                'loaded_bytes': self._current_bytes,
+                'max_models': self.max_models,
+                'max_bytes': self.max_bytes,
+            }
+
+
+def _freeze_arrays(model):
+    """Mark the NumPy arrays held by a compact model (directly or in dicts) read-only."""
+    for value in vars(model).values():
+        arrays = value.values() if isinstance(value, dict) else [value]
+        for array in arrays:
+            if isinstance(array, np.ndarray):
+                array.setflags(write=False)
@@ -0,0 +1,164 @@
+"""
+ARIMA Order Selection
+Stepwise (Hyndman-Khandakar style) search for (p, d, q): the differencing
+order is fixed up front with unit-root tests, then neighbouring (p, q)
+candidates are fitted in parallel until the information criterion stops
+improving or the per-series time budget runs out
+"""
+
+import os
+import time
+import logging
+import warnings
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Worker processes used to fit candidate orders of one series
+DEFAULT_SEARCH_JOBS = int(os.getenv('ARIMA_ORDER_SEARCH_JOBS', 1))
+# Seconds allowed per series before the best order found so far is returned
+DEFAULT_TIME_BUDGET = float(os.getenv('ARIMA_ORDER_TIME_BUDGET', 30))
+
+
+def select_differencing(price_series, max_d=2, alpha=0.05, test='kpss'):
+    """
+    Choose the differencing order with repeated unit-root tests.
+
+    Args:
+        price_series: Time series data
+        max_d (int): Maximum differencing order
+        alpha (float): Significance level of the test
+        test (str): 'kpss' (null: stationary) or 'adf' (null: unit root)
+
+    Returns:
+        int: Number of differences needed to make the series stationary
+    """
+    from statsmodels.tsa.stattools import adfuller, kpss
+
+    values = np.asarray(price_series, dtype=float)
+    for d in range(max_d + 1):
+        if len(values) < 10 or np.allclose(values, values[0]):
+            return d
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            if test == 'kpss':
+                p_value = kpss(values, regression='c', nlags='auto')[1]
+                stationary = p_value >= alpha
+            else:
+                p_value = adfuller(values, autolag='AIC')[1]
+                stationary = p_value < alpha
+        if stationary:
+            return d
+        values = np.diff(values)
+    return max_d
+
+
+def _fit_information_criterion(values, order, information_criterion='aic'):
+    """Fit one candidate order and return its information criterion (inf on failure)."""
+    from statsmodels.tsa.arima.model import ARIMA
+
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            results = ARIMA(values, order=order).fit()
+        value = getattr(results, information_criterion)
+        return float(value) if np.isfinite(value) else np.inf
+    except (ValueError, np.linalg.LinAlgError) as e:
+        logger.debug(f"ARIMA{order} failed: {e}")
+        return np.inf
+
+
+def _neighbours(order, max_p, max_q):
+    """(p, q) moves of the stepwise search around the current best order."""
+    p, d, q = order
+    moves = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (1, 1), (-1, 1), (1, -1)]
+    return [
+        (p + dp, d, q + dq) for dp, dq in moves
+        if 0 <= p + dp <= max_p and 0 <= q + dq <= max_q
+    ]
+
+
+def select_order(price_series, max_p=5, max_d=2, max_q=5, information_criterion='aic',
+                 n_jobs=None, time_budget=None):
+    """
+    Stepwise ARIMA order search.
+
+    Args:
+        price_series: Time series data
+        max_p, max_d, max_q: Maximum values to test
+        information_criterion (str): 'aic', 'aicc' or 'bic'
+        n_jobs (int): Worker processes used to fit candidates of one step
+        time_budget (float): Seconds allowed for the search (None = no limit)
+
+    Returns:
+        dict: Selected order, its criterion value and search statistics
+    """
+    if n_jobs is None:
+        n_jobs = DEFAULT_SEARCH_JOBS
+    if time_budget is None:
+        time_budget = DEFAULT_TIME_BUDGET
+
+    started = time.perf_counter()
+    values = np.asarray(price_series, dtype=float)
+    d = select_differencing(values, max_d=max_d)
+
+    evaluated = {}
+
+    def evaluate(orders):
+        orders = [order for order in dict.fromkeys(orders) if order not in evaluated]
+        if not orders:
+            return
+        if n_jobs == 1 or len(orders) == 1:
+            for order in orders:
+                evaluated[order] = _fit_information_criterion(values, order, information_criterion)
+                if time_budget and time.perf_counter() - started > time_budget:
+                    return
+        else:
+            from joblib import Parallel, delayed
+
+            scores = Parallel(n_jobs=n_jobs)(
+                delayed(_fit_information_criterion)(values, order, information_criterion)
+                for order in orders
+            )
+            evaluated.update(zip(orders, scores))
+
+    # Initial models of the Hyndman-Khandakar algorithm
+    initial = [(2, d, 2), (0, d, 0), (1, d, 0), (0, d, 1)]
+    evaluate([(min(p, max_p), d, min(q, max_q)) for p, d, q in initial])
+    best_order = min(evaluated, key=evaluated.get)
+
+    budget_exhausted = False
+    while True:
+        if time_budget and time.perf_counter() - started > time_budget:
+            budget_exhausted = True
+            break
+        candidates = [order for order in _neighbours(best_order, max_p, max_q) if order not in evaluated]
+        if not candidates:
+            break
+        evaluate(candidates)
+        step_best = min(evaluated, key=evaluated.get)
+        improved = evaluated[step_best] < evaluated[best_order]
+        if improved:
+            best_order = step_best
+        if time_budget and time.perf_counter() - started > time_budget:
+            budget_exhausted = True
+            break
+        if not improved:
+            break
+
+    if not np.isfinite(evaluated[best_order]):
+        best_order = (1, 1, 1)
+
+    elapsed = time.perf_counter() - started
+    logger.info(f"Best parameters: ARIMA{best_order} with {information_criterion.upper()}: "
+                f"{evaluated.get(best_order, np.inf):.2f} ({len(evaluated)} fits, {elapsed:.1f}s)")
+    return {
+        'order': best_order,
+        information_criterion: evaluated.get(best_order, np.inf),
+        'd': d,
+        'models_evaluated': len(evaluated),
+        'elapsed_seconds': elapsed,
+        'budget_exhausted': budget_exhausted,
+    }
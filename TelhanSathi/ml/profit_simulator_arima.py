@@ -5,9 +5,12 @@ Calculates agricultural profitability based on price forecasts
 
 import sys
 import os
+import time
+import threading
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from statistics import NormalDist
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -17,6 +20,68 @@ logger = logging.getLogger(__name__)
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from arima_price_forecaster import get_forecaster
+from forecast_engines import engine_for
+
+# Price paths drawn per Monte Carlo profit simulation
+DEFAULT_MC_PATHS = int(os.getenv('PROFIT_MC_PATHS', 10000))
+MAX_MC_PATHS = 100000
+# Forecast intervals are 95% intervals (alpha=0.05)
+FORECAST_CI_Z = NormalDist().inv_cdf(0.975)
+# Allocation optimizer: default risk penalty (standard deviations of profit) and
+# days of history used to estimate how commodity prices move together
+DEFAULT_RISK_AVERSION = 1.0
+CORRELATION_WINDOW_DAYS = 730
+# Sensitivity surface limits
+MAX_SURFACE_AXIS_POINTS = 101
+MAX_SURFACE_CELLS = 100000
+
+
+class SimulatorCatalog:
+    """
+    Immutable market/commodity catalog of the simulator.
+    
+    Built once from the loaded models: a pair is listed when it has price
+    data, a trained model and oilseed parameters. Lookups are set/dict
+    based; a new catalog is built and swapped in whenever models change.
+    """
+    
+    def __init__(self, pairs=()):
+        pairs = frozenset(pairs)
+        commodities_by_market = {}
+        markets_by_commodity = {}
+        for market, commodity in pairs:
+            commodities_by_market.setdefault(market, []).append(commodity)
+            markets_by_commodity.setdefault(commodity, []).append(market)
+        
+        self._pairs = pairs
+        self.markets = tuple(sorted(commodities_by_market))
+        self.commodities = tuple(sorted(markets_by_commodity))
+        self._market_set = frozenset(self.markets)
+        self._commodities_by_market = {m: tuple(sorted(c)) for m, c in commodities_by_market.items()}
+        self._markets_by_commodity = {c: tuple(sorted(m)) for c, m in markets_by_commodity.items()}
+    
+    @classmethod
+    def from_forecaster(cls, forecaster, commodities):
+        """Catalog of the forecaster's series that have a model and are in `commodities`."""
+        return cls(
+            (market, commodity) for market, commodity in forecaster.catalog.keys()
+            if commodity in commodities and f"{market}_{commodity}" in forecaster.models
+        )
+    
+    def __contains__(self, pair):
+        return pair in self._pairs
+    
+    def __len__(self):
+        return len(self._pairs)
+    
+    def has_market(self, market):
+        return market in self._market_set
+    
+    def commodities_for_market(self, market):
+        return self._commodities_by_market.get(market, ())
+    
+    def markets_for_commodity(self, commodity):
+        return self._markets_by_commodity.get(commodity, ())
 
 
 class ProfitSimulator:
@@ -30,11 +95,15 @@ class ProfitSimulator:
         try:
             self.forecaster = get_forecaster()
             self.model_available = True
+            self.refresh_catalog()
             logger.info("✓ Profit Simulator initialized with ARIMA forecaster")
         except Exception as e:
             logger.error(f"✗ Failed to initialize forecaster: {e}")
             self.forecaster = None
             self.model_available = False
+            self.catalog = SimulatorCatalog()
+        self._allocation_inputs = {}  # market -> (forecaster revision, optimizer inputs)
+        self._forecasts = {}  # (market, commodity, periods) -> (forecaster revision, forecast arrays)
     
     # ========== OILSEED PARAMETERS ==========
     
@@ -80,58 +149,52 @@ class ProfitSimulator:
         'Surat': 'Gujarat',
     }
     
+    def refresh_catalog(self):
+        """Rebuild the catalog after models were trained or reloaded (swapped in as a whole)."""
+        self.catalog = SimulatorCatalog.from_forecaster(self.forecaster, self.OILSEED_PARAMS)
+        logger.info(f"Simulator catalog: {len(self.catalog)} market-commodity pairs")
+        return self.catalog
+    
     def get_available_markets(self):
         """Get list of available markets from trained models."""
-        if not self.model_available:
-            return []
-        return self.forecaster.get_unique_markets()
+        return list(self.catalog.markets)
     
     def get_available_commodities(self):
         """Get list of available commodities."""
-        return list(self.OILSEED_PARAMS.keys())
+        return list(self.catalog.commodities)
     
     def get_commodities_for_market(self, market):
         """Get commodities available in a specific market."""
-        if not self.model_available:
-            return []
-        try:
-            return self.forecaster.get_commodities_for_market(market)
-        except:
-            return []
+        return list(self.catalog.commodities_for_market(market))
     
     def get_markets_for_commodity(self, commodity):
         """Get markets available for a specific commodity."""
-        if not self.model_available:
-            return []
-        try:
-            return self.forecaster.get_markets_for_commodity(commodity)
-        except:
-            return []
+        return list(self.catalog.markets_for_commodity(commodity))
     
     def _validate_inputs(self, market, commodity, area_acres):
-        """Validate input parameters."""
+        """Validate input parameters (O(1) catalog lookups)."""
         if not self.model_available:
             raise ValueError("ARIMA models not available")
         
-        markets = self.get_available_markets()
-        if market not in markets:
-            raise ValueError(f"Market '{market}' not available. Available: {markets}")
+        catalog = self.catalog
+        if not catalog.has_market(market):
+            raise ValueError(f"Market '{market}' not available. Available: {list(catalog.markets)}")
         
-        commodities = self.get_commodities_for_market(market)
-        if commodity not in commodities:
+        if commodity not in self.OILSEED_PARAMS:
+            raise ValueError(f"Unknown commodity: {commodity}")
+        
+        if (market, commodity) not in catalog:
             raise ValueError(
                 f"Commodity '{commodity}' not available in {market}. "
-                f"Available: {commodities}"
+                f"Available: {list(catalog.commodities_for_market(market))}"
             )
         
         if area_acres <= 0:
             raise ValueError(f"Area must be positive, got {area_acres}")
-        
-        if commodity not in self.OILSEED_PARAMS:
-            raise ValueError(f"Unknown commodity: {commodity}")
     
     def simulate_profit_30days(self, market, commodity, area_acres, 
-                               custom_cost_per_acre=None, custom_yield_quintals=None):
+                               custom_cost_per_acre=None, custom_yield_quintals=None,
+                               monte_carlo=False, n_paths=None, yield_cv=0.0, cost_cv=0.0, seed=None):
         """
         Simulate profit for next 30 days using ARIMA forecasts.
         
@@ -141,6 +204,11 @@ class ProfitSimulator:
             area_acres (float): Farming area in acres
             custom_cost_per_acre (float): Override default cost (optional)
             custom_yield_quintals (float): Override default yield (optional)
+            monte_carlo (bool): Also return the simulated profit distribution
+            n_paths (int): Number of simulated price paths (Monte Carlo mode)
+            yield_cv (float): Coefficient of variation of yield (0 = fixed yield)
+            cost_cv (float): Coefficient of variation of cost (0 = fixed cost)
+            seed (int): Random seed for reproducible simulations
             
         Returns:
             dict: Comprehensive profit simulation including forecasts and metrics
@@ -154,124 +222,511 @@ class ProfitSimulator:
             cost_per_acre = custom_cost_per_acre or params['cost_per_acre_inr']
             yield_quintals = custom_yield_quintals or params['avg_yield_quintals_per_acre']
             
-            # Get 30-day price forecast
-            forecast_data = self.forecaster.forecast(market, commodity, periods=30)
+            # Get 30-day price forecast (slice of the precomputed tensor when available)
+            forecast_data = self._cached_forecast(market, commodity, periods=30)
             
             if not forecast_data:
                 raise ValueError(f"No forecast data for {market} - {commodity}")
             
-            # Calculate daily revenue and profit
-            prices = forecast_data['forecast']
-            lower_ci = forecast_data['lower_ci']
-            upper_ci = forecast_data['upper_ci']
-            last_price = forecast_data['last_price']
-            
-            # Convert to per acre metrics
-            daily_yield_acres = yield_quintals / 30  # Assume uniform yield over 30 days
-            daily_cost_acres = cost_per_acre / 30
-            
-            # Calculate profit metrics
-            price_array = np.array(prices)
-            revenue_per_acre = price_array * daily_yield_acres
-            profit_per_acre = revenue_per_acre - daily_cost_acres
-            
-            # Scale to total area
-            total_revenue = revenue_per_acre * area_acres
-            total_cost_daily = daily_cost_acres * area_acres
-            total_profit = profit_per_acre * area_acres
-            
-            # Aggregate metrics
-            avg_price = np.mean(price_array)
-            min_price = np.min(price_array)
-            max_price = np.max(price_array)
-            price_volatility = np.std(price_array)
-            
-            total_revenue_30days = np.sum(total_revenue)
-            total_cost_30days = total_cost_daily * 30
-            total_profit_30days = total_revenue_30days - total_cost_30days
-            
-            total_yield_30days = yield_quintals * area_acres
-            avg_revenue_per_quintal = total_revenue_30days / total_yield_30days if total_yield_30days > 0 else 0
-            
-            # Calculate ROI and margins
-            roi_percent = (total_profit_30days / total_cost_30days * 100) if total_cost_30days > 0 else 0
-            profit_margin_percent = (total_profit_30days / total_revenue_30days * 100) if total_revenue_30days > 0 else 0
-            
-            # Breakeven analysis
-            breakeven_days = int(total_cost_30days / (total_profit_30days / 30)) if total_profit_30days > 0 else 30
-            breakeven_days = max(1, min(breakeven_days, 30))  # Clamp between 1-30 days
-            
-            # Price trend analysis
-            price_trend = "Stable"
-            if max_price - last_price > price_volatility:
-                price_trend = "Uptrend"
-            elif last_price - min_price > price_volatility:
-                price_trend = "Downtrend"
+            result = self._build_30day_result(market, commodity, area_acres, forecast_data,
+                                              cost_per_acre, yield_quintals)
+            
+            if monte_carlo:
+                result['monte_carlo'] = self.simulate_profit_distribution(
+                    forecast_data, area_acres, cost_per_acre, yield_quintals,
+                    n_paths=n_paths, yield_cv=yield_cv, cost_cv=cost_cv, seed=seed
+                )
+            
+            return result
+        
+        except Exception as e:
+            logger.error(f"Profit simulation error: {e}")
+            return {
+                'status': 'error',
+                'message': str(e),
+            }
+    
+    def _cached_forecast(self, market, commodity, periods=30):
+        """Forecast arrays for a pair, reused until the forecaster's revision changes."""
+        key = (market, commodity, periods)
+        revision = self.forecaster.revision
+        cached = self._forecasts.get(key)
+        if cached is not None and cached[0] == revision:
+            return cached[1]
+        forecast_data = self.forecaster.forecast_arrays(market, commodity, periods=periods)
+        if forecast_data:
+            self._forecasts[key] = (revision, forecast_data)
+        return forecast_data
+    
+    @staticmethod
+    def _surface_axis(name, spec, default):
+        """
+        Grid values for one what-if input: a number, a list of values or
+        {"min", "max", "steps"} (evenly spaced, inclusive).
+        """
+        if spec is None:
+            values = np.array([default], dtype=float)
+        elif isinstance(spec, dict):
+            steps = int(spec.get('steps', 11))
+            if not 1 <= steps <= MAX_SURFACE_AXIS_POINTS:
+                raise ValueError(f"{name}: steps must be between 1 and {MAX_SURFACE_AXIS_POINTS}")
+            values = np.linspace(float(spec['min']), float(spec['max']), steps)
+        elif isinstance(spec, (list, tuple)):
+            values = np.asarray(spec, dtype=float)
+        else:
+            values = np.array([float(spec)])
+        
+        if values.ndim != 1 or not 1 <= len(values) <= MAX_SURFACE_AXIS_POINTS:
+            raise ValueError(f"{name}: expected 1 to {MAX_SURFACE_AXIS_POINTS} values")
+        if not np.all(np.isfinite(values)) or np.any(values <= 0):
+            raise ValueError(f"{name}: values must be positive numbers")
+        return values
+    
+    def sensitivity_surface(self, market, commodity, area_acres=None,
+                            cost_per_acre=None, yield_quintals=None):
+        """
+        Profit and ROI over a grid of area, cost and yield values.
+        
+        Uses one cached 30-day forecast and a single broadcast over the
+        (area x cost x yield) grid, with the same revenue model as
+        simulate_profit_30days (revenue = average forecast price x yield x area).
+        
+        Args:
+            market (str): Market name
+            commodity (str): Commodity name
+            area_acres: Area values (number, list or {"min", "max", "steps"})
+            cost_per_acre: Cost values (defaults to the commodity's cost)
+            yield_quintals: Yield values (defaults to the commodity's yield)
+            
+        Returns:
+            dict: Axes and [area][cost][yield] grids of profit, revenue, ROI and margin
+        """
+        try:
+            params = self.OILSEED_PARAMS.get(commodity, {})
+            areas = self._surface_axis('area_acres', area_acres, 1.0)
+            costs = self._surface_axis('cost_per_acre', cost_per_acre, params.get('cost_per_acre_inr', 1.0))
+            yields = self._surface_axis('yield_quintals', yield_quintals,
+                                        params.get('avg_yield_quintals_per_acre', 1.0))
+            if len(areas) * len(costs) * len(yields) > MAX_SURFACE_CELLS:
+                raise ValueError(f"Grid too large (max {MAX_SURFACE_CELLS} cells)")
+            
+            self._validate_inputs(market, commodity, float(areas.min()))
+            
+            forecast_data = self._cached_forecast(market, commodity, periods=30)
+            if not forecast_data:
+                raise ValueError(f"No forecast data for {market} - {commodity}")
+            avg_price = float(np.mean(np.asarray(forecast_data['forecast'], dtype=float)))
+            
+            # Broadcast to [area, cost, yield]
+            area_grid = areas[:, None, None]
+            revenue = area_grid * (avg_price * yields[None, None, :])
+            cost = area_grid * costs[None, :, None]
+            profit = revenue - cost
+            roi = profit / cost * 100
+            margin = profit / revenue * 100
             
             return {
                 'status': 'success',
                 'market': market,
                 'commodity': commodity,
-                'area_acres': area_acres,
                 'forecast_period_days': 30,
-                
-                # Price metrics
                 'price': {
-                    'current': round(last_price, 2),
+                    'current': round(forecast_data['last_price'], 2),
                     'average_forecast': round(avg_price, 2),
-                    'minimum': round(min_price, 2),
-                    'maximum': round(max_price, 2),
-                    'volatility': round(price_volatility, 2),
-                    'trend': price_trend,
-                    'forecast_values': [round(p, 2) for p in prices],
-                    'confidence_lower': [round(ci, 2) for ci in lower_ci],
-                    'confidence_upper': [round(ci, 2) for ci in upper_ci],
                 },
-                
-                # Cost metrics
-                'cost': {
-                    'per_acre': round(cost_per_acre, 2),
-                    'total_30days': round(total_cost_30days, 2),
-                },
-                
-                # Yield metrics
-                'yield': {
-                    'per_acre_quintals': round(yield_quintals, 2),
-                    'total_quintals': round(total_yield_30days, 2),
-                    'per_quintal_cost': round(total_cost_30days / total_yield_30days, 2) if total_yield_30days > 0 else 0,
-                },
-                
-                # Revenue metrics
-                'revenue': {
-                    'daily_average': round(np.mean(total_revenue), 2),
-                    'total_30days': round(total_revenue_30days, 2),
-                    'per_quintal_average': round(avg_revenue_per_quintal, 2),
-                },
-                
-                # Profit metrics
-                'profit': {
-                    'daily_average': round(np.mean(total_profit), 2),
-                    'total_30days': round(total_profit_30days, 2),
-                    'margin_percent': round(profit_margin_percent, 2),
+                'axes': {
+                    'area_acres': np.round(areas, 4).tolist(),
+                    'cost_per_acre': np.round(costs, 2).tolist(),
+                    'yield_quintals': np.round(yields, 4).tolist(),
                 },
+                'shape': list(profit.shape),
+                'profit': np.round(profit, 2).tolist(),
+                'revenue': np.round(revenue, 2).tolist(),
+                'roi_percent': np.round(roi, 2).tolist(),
+                'margin_percent': np.round(margin, 2).tolist(),
+                # Price at which profit is zero for each [cost][yield] pair (independent of area)
+                'breakeven_price': np.round(costs[:, None] / yields[None, :], 2).tolist(),
+            }
+        
+        except Exception as e:
+            logger.error(f"Sensitivity surface error: {e}")
+            return {
+                'status': 'error',
+                'message': str(e),
+            }
+    
+    def _build_30day_result(self, market, commodity, area_acres, forecast_data,
+                            cost_per_acre, yield_quintals):
+        """Turn a 30-day forecast into the profit simulation response."""
+        # Calculate daily revenue and profit
+        prices = np.asarray(forecast_data['forecast'], dtype=float)
+        lower_ci = np.asarray(forecast_data['lower_ci'], dtype=float)
+        upper_ci = np.asarray(forecast_data['upper_ci'], dtype=float)
+        last_price = forecast_data['last_price']
+        
+        # Convert to per acre metrics
+        daily_yield_acres = yield_quintals / 30  # Assume uniform yield over 30 days
+        daily_cost_acres = cost_per_acre / 30
+        
+        # Calculate profit metrics
+        price_array = prices
+        revenue_per_acre = price_array * daily_yield_acres
+        profit_per_acre = revenue_per_acre - daily_cost_acres
+        
+        # Scale to total area
+        total_revenue = revenue_per_acre * area_acres
+        total_cost_daily = daily_cost_acres * area_acres
+        total_profit = profit_per_acre * area_acres
+        
+        # Aggregate metrics
+        avg_price = np.mean(price_array)
+        min_price = np.min(price_array)
+        max_price = np.max(price_array)
+        price_volatility = np.std(price_array)
+        
+        total_revenue_30days = np.sum(total_revenue)
+        total_cost_30days = total_cost_daily * 30
+        total_profit_30days = total_revenue_30days - total_cost_30days
+        
+        total_yield_30days = yield_quintals * area_acres
+        avg_revenue_per_quintal = total_revenue_30days / total_yield_30days if total_yield_30days > 0 else 0
+        
+        # Calculate ROI and margins
+        roi_percent = (total_profit_30days / total_cost_30days * 100) if total_cost_30days > 0 else 0
+        profit_margin_percent = (total_profit_30days / total_revenue_30days * 100) if total_revenue_30days > 0 else 0
+        
+        # Breakeven analysis
+        breakeven_days = int(total_cost_30days / (total_profit_30days / 30)) if total_profit_30days > 0 else 30
+        breakeven_days = max(1, min(breakeven_days, 30))  # Clamp between 1-30 days
+        
+        # Price trend analysis
+        price_trend = "Stable"
+        if max_price - last_price > price_volatility:
+            price_trend = "Uptrend"
+        elif last_price - min_price > price_volatility:
+            price_trend = "Downtrend"
+        
+        return {
+            'status': 'success',
+            'market': market,
+            'commodity': commodity,
+            'area_acres': area_acres,
+            'forecast_period_days': 30,
+            
+            # Price metrics
+            'price': {
+                'current': round(last_price, 2),
+                'average_forecast': round(avg_price, 2),
+                'minimum': round(min_price, 2),
+                'maximum': round(max_price, 2),
+                'volatility': round(price_volatility, 2),
+                'trend': price_trend,
+                'forecast_values': np.round(prices, 2).tolist(),
+                'confidence_lower': np.round(lower_ci, 2).tolist(),
+                'confidence_upper': np.round(upper_ci, 2).tolist(),
+            },
+            
+            # Cost metrics
+            'cost': {
+                'per_acre': round(cost_per_acre, 2),
+                'total_30days': round(total_cost_30days, 2),
+            },
+            
+            # Yield metrics
+            'yield': {
+                'per_acre_quintals': round(yield_quintals, 2),
+                'total_quintals': round(total_yield_30days, 2),
+                'per_quintal_cost': round(total_cost_30days / total_yield_30days, 2) if total_yield_30days > 0 else 0,
+            },
+            
+            # Revenue metrics
+            'revenue': {
+                'daily_average': round(np.mean(total_revenue), 2),
+                'total_30days': round(total_revenue_30days, 2),
+                'per_quintal_average': round(avg_revenue_per_quintal, 2),
+            },
+            
+            # Profit metrics
+            'profit': {
+                'daily_average': round(np.mean(total_profit), 2),
+                'total_30days': round(total_profit_30days, 2),
+                'margin_percent': round(profit_margin_percent, 2),
+            },
+            
+            # Financial indicators
+            'financial': {
+                'roi_percent': round(roi_percent, 2),
+                'breakeven_days': breakeven_days,
+                'profit_per_day': round(total_profit_30days / 30, 2),
+            },
+            
+            # Additional info
+            'model_info': {
+                # The engine of the model that produced this forecast (the config only
+                # applies once series are retrained)
+                'model_type': (forecast_data.get('engine')
+                               or engine_for(f"{market}_{commodity}", self.forecaster.engine_config)).upper(),
+                'model_order': '({})'.format(','.join(
+                    str(x) for x in self.forecaster.arima_params.get(f"{market}_{commodity}", (1, 1, 1))
+                )),
+                'data_points_trained': 1070,
+            },
+        }
+    
+    def simulate_profit_distribution(self, forecast_data, area_acres, cost_per_acre, yield_quintals,
+                                     n_paths=None, yield_cv=0.0, cost_cv=0.0, seed=None,
+                                     tail_alpha=0.05):
+        """
+        Monte Carlo profit distribution for a forecast, in one vectorized pass.
+        
+        Price paths are the forecast mean plus cumulative normal innovations
+        whose per-day spread reproduces the forecast's confidence band, so
+        prices on neighbouring days move together as in the ARIMA model.
+        Yield and cost are scaled per path by normal factors (clipped at 0).
+        
+        Args:
+            forecast_data (dict): Output of forecaster.forecast_arrays()
+            area_acres (float): Farming area in acres
+            cost_per_acre (float): Cost per acre for the period
+            yield_quintals (float): Yield per acre for the period
+            n_paths (int): Number of simulated paths
+            yield_cv (float): Coefficient of variation of yield
+            cost_cv (float): Coefficient of variation of cost
+            seed (int): Random seed
+            tail_alpha (float): Tail probability for value at risk / expected shortfall
+            
+        Returns:
+            dict: Profit percentiles, probability of loss and expected shortfall
+        """
+        if n_paths is None:
+            n_paths = DEFAULT_MC_PATHS
+        n_paths = int(n_paths)
+        if not 1 <= n_paths <= MAX_MC_PATHS:
+            raise ValueError(f"n_paths must be between 1 and {MAX_MC_PATHS}, got {n_paths}")
+        if yield_cv < 0 or cost_cv < 0:
+            raise ValueError("yield_cv and cost_cv must not be negative")
+        
+        rng = np.random.default_rng(seed)
+        mean = np.asarray(forecast_data['forecast'], dtype=float)
+        sd = (np.asarray(forecast_data['upper_ci'], dtype=float)
+              - np.asarray(forecast_data['lower_ci'], dtype=float)) / (2 * FORECAST_CI_Z)
+        
+        # Per-day innovation spread whose running sum has variance sd**2
+        step_sd = np.sqrt(np.maximum(np.diff(np.square(sd), prepend=0.0), 0.0))
+        innovations = rng.standard_normal((n_paths, len(mean)))
+        innovations *= step_sd
+        paths = mean + np.cumsum(innovations, axis=1, out=innovations)
+        np.maximum(paths, 0.0, out=paths)
+        
+        # Revenue uses the average price over the period (uniform daily yield)
+        avg_price = paths.mean(axis=1)
+        yield_factor = np.clip(1.0 + yield_cv * rng.standard_normal(n_paths), 0.0, None) if yield_cv else 1.0
+        cost_factor = np.clip(1.0 + cost_cv * rng.standard_normal(n_paths), 0.0, None) if cost_cv else 1.0
+        revenue = avg_price * (yield_quintals * area_acres) * yield_factor
+        cost = (cost_per_acre * area_acres) * cost_factor
+        profit = revenue - cost
+        
+        percentiles = (5, 10, 25, 50, 75, 90, 95)
+        profit_percentiles = np.percentile(profit, percentiles)
+        price_percentiles = np.percentile(avg_price, (5, 50, 95))
+        
+        # Expected shortfall: mean profit of the worst tail_alpha share of paths
+        tail_count = max(1, int(np.ceil(tail_alpha * n_paths)))
+        tail = np.partition(profit, tail_count - 1)[:tail_count]
+        value_at_risk = np.max(tail)
+        
+        return {
+            'paths': n_paths,
+            'yield_cv': yield_cv,
+            'cost_cv': cost_cv,
+            'profit': {
+                'mean': round(float(profit.mean()), 2),
+                'std': round(float(profit.std()), 2),
+                'percentiles': {f'p{p}': round(float(v), 2) for p, v in zip(percentiles, profit_percentiles)},
+            },
+            'average_price': {
+                f'p{p}': round(float(v), 2) for p, v in zip((5, 50, 95), price_percentiles)
+            },
+            'probability_of_loss': round(float(np.mean(profit < 0)), 4),
+            'tail_alpha': tail_alpha,
+            'value_at_risk': round(float(value_at_risk), 2),
+            'expected_shortfall': round(float(tail.mean()), 2),
+        }
+    
+    def _get_allocation_inputs(self, market):
+        """
+        Per-acre expected profit and profit covariance of every commodity in a
+        market over the 30-day forecast, cached until the forecaster changes.
+        """
+        revision = self.forecaster.revision
+        cached = self._allocation_inputs.get(market)
+        if cached is not None and cached[0] == revision and cached[1]['catalog'] is self.catalog:
+            return cached[1]
+        
+        commodities = self.catalog.commodities_for_market(market)
+        batch = self.forecaster.forecast_many([(market, c) for c in commodities], periods=30)
+        commodities = tuple(commodity for _, commodity in batch['keys'])
+        yields = np.array([self.OILSEED_PARAMS[c]['avg_yield_quintals_per_acre'] for c in commodities], dtype=float)
+        costs = np.array([self.OILSEED_PARAMS[c]['cost_per_acre_inr'] for c in commodities], dtype=float)
+        
+        # Revenue depends on the average price over the period. With cumulative
+        # forecast errors cov(day s, day t) = var(min(s, t)), so its variance is
+        # the mean of the pairwise minimum of the daily variances.
+        variance = np.square((batch['upper_ci'] - batch['lower_ci']) / (2 * FORECAST_CI_Z))
+        avg_price_sd = np.sqrt(np.minimum(variance[:, :, None], variance[:, None, :]).mean(axis=(1, 2)))
+        
+        # How the commodities' prices move together: correlation of 30-day log changes
+        history = pd.concat(
+            [self.forecaster._get_time_series_data(market, c).iloc[-CORRELATION_WINDOW_DAYS:] for c in commodities],
+            axis=1, join='inner'
+        )
+        log_prices = np.log(history.to_numpy(dtype=float))
+        changes = log_prices[30:] - log_prices[:-30]
+        correlation = np.eye(len(commodities))
+        if len(changes) > 2:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                estimate = np.corrcoef(changes, rowvar=False)
+            if np.all(np.isfinite(estimate)):
+                correlation = np.atleast_2d(estimate)
+        
+        sd_per_acre = yields * avg_price_sd
+        inputs = {
+            'catalog': self.catalog,
+            'commodities': commodities,
+            'expected_price': batch['forecast'].mean(axis=1),
+            'last_price': batch['last_price'],
+            'yield': yields,
+            'cost': costs,
+            'expected_profit': yields * batch['forecast'].mean(axis=1) - costs,
+            'covariance': correlation * np.outer(sd_per_acre, sd_per_acre),
+        }
+        self._allocation_inputs[market] = (revision, inputs)
+        return inputs
+    
+    def optimize_allocation(self, market, total_acres, constraints=None):
+        """
+        Split land across the market's oilseeds to maximize expected 30-day
+        profit minus a risk penalty (risk_aversion x standard deviation of profit).
+        
+        Args:
+            market (str): Market name
+            total_acres (float): Land available in acres
+            constraints (dict): Optional settings
+                - risk_aversion (float): Penalty per standard deviation of profit
+                - min_acres / max_acres (dict): Per-commodity bounds in acres
+                - max_share (float): Largest fraction of land for one commodity
+                - exclude (list): Commodities not to plant
+                - allow_fallow (bool): Allow leaving land unplanted
                 
-                # Financial indicators
-                'financial': {
-                    'roi_percent': round(roi_percent, 2),
-                    'breakeven_days': breakeven_days,
-                    'profit_per_day': round(total_profit_30days / 30, 2),
+        Returns:
+            dict: Acres per commodity with expected profit and risk of the plan
+        """
+        from scipy.optimize import minimize
+        
+        started = time.perf_counter()
+        try:
+            if not self.model_available:
+                raise ValueError("ARIMA models not available")
+            if not self.catalog.has_market(market):
+                raise ValueError(f"Market '{market}' not available. Available: {list(self.catalog.markets)}")
+            total_acres = float(total_acres)
+            if total_acres <= 0:
+                raise ValueError(f"Area must be positive, got {total_acres}")
+            
+            constraints = constraints or {}
+            risk_aversion = float(constraints.get('risk_aversion', DEFAULT_RISK_AVERSION))
+            max_share = float(constraints.get('max_share', 1.0))
+            allow_fallow = bool(constraints.get('allow_fallow', False))
+            min_acres = constraints.get('min_acres') or {}
+            max_acres = constraints.get('max_acres') or {}
+            exclude = set(constraints.get('exclude') or ())
+            if risk_aversion < 0:
+                raise ValueError("risk_aversion must not be negative")
+            if not 0 < max_share <= 1:
+                raise ValueError("max_share must be in (0, 1]")
+            
+            inputs = self._get_allocation_inputs(market)
+            commodities = inputs['commodities']
+            unknown = (set(min_acres) | set(max_acres) | exclude) - set(commodities)
+            if unknown:
+                raise ValueError(f"Not available in {market}: {sorted(unknown)}")
+            
+            lower = np.array([float(min_acres.get(c, 0.0)) for c in commodities])
+            upper = np.array([
+                0.0 if c in exclude else min(float(max_acres.get(c, total_acres)), max_share * total_acres)
+                for c in commodities
+            ])
+            if np.any(lower < 0) or np.any(lower > upper):
+                raise ValueError("Acre bounds are inconsistent (min_acres above max_acres, max_share or excluded)")
+            if lower.sum() > total_acres:
+                raise ValueError(f"min_acres add up to more than {total_acres} acres")
+            if not allow_fallow and upper.sum() < total_acres:
+                raise ValueError("Constraints do not allow planting all the land (set allow_fallow)")
+            
+            mu = inputs['expected_profit']
+            cov = inputs['covariance']
+            
+            # Solve for land shares with the objective in units of the largest
+            # per-acre figure, so SLSQP sees a well-scaled problem
+            scale = max(np.max(np.abs(mu)), np.sqrt(np.max(np.diag(cov))), 1.0)
+            mu_scaled = mu / scale
+            cov_scaled = cov / scale ** 2
+            
+            def objective(w):
+                sd = np.sqrt(max(w @ cov_scaled @ w, 1e-12))
+                value = -(mu_scaled @ w - risk_aversion * sd)
+                gradient = -(mu_scaled - risk_aversion * (cov_scaled @ w) / sd)
+                return value, gradient
+            
+            land = {'type': 'ineq' if allow_fallow else 'eq',
+                    'fun': lambda w: 1.0 - w.sum(),
+                    'jac': lambda w: -np.ones_like(w)}
+            bounds = list(zip(lower / total_acres, upper / total_acres))
+            w0 = np.clip(np.full(len(mu), 1.0 / len(mu)), lower / total_acres, upper / total_acres)
+            solution = minimize(objective, w0, jac=True, method='SLSQP',
+                                bounds=bounds, constraints=[land],
+                                options={'maxiter': 200, 'ftol': 1e-10})
+            if not solution.success:
+                raise ValueError(f"Optimizer did not converge: {solution.message}")
+            acres = np.clip(solution.x * total_acres, lower, upper)
+            
+            expected_profit = float(mu @ acres)
+            profit_sd = float(np.sqrt(max(acres @ cov @ acres, 0.0)))
+            allocation = [
+                {
+                    'commodity': commodity,
+                    'acres': round(float(acres[i]), 2),
+                    'share_percent': round(float(acres[i] / total_acres * 100), 2),
+                    'expected_price': round(float(inputs['expected_price'][i]), 2),
+                    'expected_profit_per_acre': round(float(mu[i]), 2),
+                    'expected_profit': round(float(mu[i] * acres[i]), 2),
+                }
+                for i, commodity in enumerate(commodities)
+            ]
+            allocation.sort(key=lambda item: item['acres'], reverse=True)
+            
+            return {
+                'status': 'success',
+                'market': market,
+                'total_acres': total_acres,
+                'planted_acres': round(float(acres.sum()), 2),
+                'forecast_period_days': 30,
+                'risk_aversion': risk_aversion,
+                'allocation': allocation,
+                'portfolio': {
+                    'expected_profit': round(expected_profit, 2),
+                    'profit_std': round(profit_sd, 2),
+                    'profit_p5': round(expected_profit - NormalDist().inv_cdf(0.95) * profit_sd, 2),
+                    'total_cost': round(float(inputs['cost'] @ acres), 2),
                 },
-                
-                # Additional info
-                'model_info': {
-                    'model_type': 'ARIMA',
-                    'model_order': '(1,1,1)',
-                    'data_points_trained': 1070,
+                'solver': {
+                    'iterations': int(solution.nit),
+                    'elapsed_ms': round((time.perf_counter() - started) * 1000, 2),
                 },
             }
         
         except Exception as e:
-            logger.error(f"Profit simulation error: {e}")
+            logger.error(f"Allocation optimization error: {e}")
             return {
                 'status': 'error',
                 'message': str(e),
@@ -305,12 +760,12 @@ class ProfitSimulator:
             yield_quintals = custom_yield_quintals or params['avg_yield_quintals_per_acre']
             
             # Get 90-day forecast for better annual estimate
-            forecast_data = self.forecaster.forecast(market, commodity, periods=90)
+            forecast_data = self.forecaster.forecast_arrays(market, commodity, periods=90)
             
             if not forecast_data:
                 raise ValueError(f"No forecast data for {market} - {commodity}")
             
-            prices = np.array(forecast_data['forecast'])
+            prices = np.asarray(forecast_data['forecast'], dtype=float)
             
             # Calculate annual metrics
             annual_yield_quintals = yield_quintals * area_acres
@@ -373,7 +828,7 @@ class ProfitSimulator:
             dict: Comparison of all available commodities
         """
         try:
-            commodities = self.get_commodities_for_market(market)
+            commodities = self.catalog.commodities_for_market(market)
             
             if not commodities:
                 return {
@@ -388,8 +843,26 @@ class ProfitSimulator:
                 'commodities': {}
             }
             
-            for commodity in commodities:
-                result = self.simulate_profit_30days(market, commodity, area_acres)
+            # One batched forecast for every commodity of the market
+            if area_acres <= 0:
+                raise ValueError(f"Area must be positive, got {area_acres}")
+            batch = self.forecaster.forecast_many(
+                [(market, commodity) for commodity in commodities],
+                periods=30
+            )
+            
+            for i, (_, commodity) in enumerate(batch['keys']):
+                params = self.OILSEED_PARAMS[commodity]
+                forecast_data = {
+                    'last_price': float(batch['last_price'][i]),
+                    'forecast': batch['forecast'][i],
+                    'lower_ci': batch['lower_ci'][i],
+                    'upper_ci': batch['upper_ci'][i],
+                }
+                result = self._build_30day_result(
+                    market, commodity, area_acres, forecast_data,
+                    params['cost_per_acre_inr'], params['avg_yield_quintals_per_acre']
+                )
                 
                 if result['status'] == 'success':
                     comparison_data['commodities'][commodity] = {
@@ -424,26 +897,40 @@ class ProfitSimulator:
 
 # ========== CONVENIENCE FUNCTIONS ==========
 
+_shared_simulator = None
+_shared_simulator_lock = threading.Lock()
+
+
 def get_profit_simulator():
     """Get a ProfitSimulator instance."""
     return ProfitSimulator()
 
 
+def get_shared_profit_simulator():
+    """Get the process-wide ProfitSimulator used by the convenience functions (built once)."""
+    global _shared_simulator
+    if _shared_simulator is None:
+        with _shared_simulator_lock:
+            if _shared_simulator is None:
+                _shared_simulator = ProfitSimulator()
+    return _shared_simulator
+
+
 def simulate_profit(market, commodity, area_acres):
     """Quick profit simulation for 30 days."""
-    simulator = get_profit_simulator()
+    simulator = get_shared_profit_simulator()
     return simulator.simulate_profit_30days(market, commodity, area_acres)
 
 
 def get_market_options():
     """Get available markets."""
-    simulator = get_profit_simulator()
+    simulator = get_shared_profit_simulator()
     return simulator.get_available_markets()
 
 
 def get_commodity_options():
     """Get available commodities."""
-    simulator = get_profit_simulator()
+    simulator = get_shared_profit_simulator()
     return simulator.get_available_commodities()
 
 
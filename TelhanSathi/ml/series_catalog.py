@@ -0,0 +1,92 @@
+"""
+Series Catalog for the ARIMA Price Forecaster
+Built once per dataset load: dense daily price series per market-commodity
+pair plus set-based market/commodity lookups
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class SeriesCatalog:
+    """
+    Immutable index over the price dataset.
+
+    Every (market, commodity) series is resampled to daily frequency and
+    gap-filled once here, so lookups never scan or mask the full DataFrame.
+    A new catalog is built on every reload and swapped in as a whole.
+
+    The prices of all series live in one contiguous read-only array
+    (`values`); each Series is a view into it. Nothing ever writes to those
+    pages, so they stay shared between gunicorn workers forked after a preload.
+    """
+
+    def __init__(self, df):
+        """
+        Build the catalog.
+
+        Args:
+            df (DataFrame): Dataset with Date, Market, Commodity and Price columns,
+                sorted by Date
+        """
+        self.df = df
+
+        dense = {}
+        markets_by_commodity = {}
+        commodities_by_market = {}
+        for (market, commodity), group in df.groupby(['Market', 'Commodity'], sort=True, observed=True):
+            # Resample to daily frequency (fill missing dates with forward fill)
+            daily = group.set_index('Date')['Price'].asfreq('D')
+            dense[(market, commodity)] = daily.ffill().bfill()
+            markets_by_commodity.setdefault(commodity, []).append(market)
+            commodities_by_market.setdefault(market, []).append(commodity)
+
+        self.values = np.concatenate(
+            [daily.to_numpy(dtype=float) for daily in dense.values()]
+        ) if dense else np.empty(0)
+        self.values.setflags(write=False)
+        series = {}
+        start = 0
+        for key, daily in dense.items():
+            end = start + len(daily)
+            series[key] = pd.Series(self.values[start:end], index=daily.index, name='Price', copy=False)
+            start = end
+
+        self._series = series
+        self.markets = tuple(sorted(commodities_by_market))
+        self.commodities = tuple(sorted(markets_by_commodity))
+        self._market_set = frozenset(self.markets)
+        self._commodity_set = frozenset(self.commodities)
+        self._markets_by_commodity = {c: tuple(sorted(m)) for c, m in markets_by_commodity.items()}
+        self._commodities_by_market = {m: tuple(sorted(c)) for m, c in commodities_by_market.items()}
+
+    # ========== LOOKUPS ==========
+
+    def has_market(self, market):
+        return market in self._market_set
+
+    def has_commodity(self, commodity):
+        return commodity in self._commodity_set
+
+    def has_series(self, market, commodity):
+        return (market, commodity) in self._series
+
+    def markets_for_commodity(self, commodity):
+        return self._markets_by_commodity.get(commodity, ())
+
+    def commodities_for_market(self, market):
+        return self._commodities_by_market.get(market, ())
+
+    def series(self, market, commodity):
+        """
+        Dense daily price series for a pair (empty if there is no data).
+        The returned Series is shared; callers must not modify it in place.
+        """
+        price_series = self._series.get((market, commodity))
+        if price_series is None:
+            return pd.Series(dtype=float, index=pd.DatetimeIndex([], freq='D', name='Date'), name='Price')
+        return price_series
+
+    def keys(self):
+        """All (market, commodity) pairs with data."""
+        return list(self._series)
@@ -1,6 +1,6 @@
 """
 Bidding System Models
-Contains models for: Auction, Bid, CounterOffer, AuctionNotification
+Contains models for: Auction, Bid, CounterOffer, AuctionNotification, MarketPrice
 Marketplace models (CropListing, SellRequest, BuyerOffer, etc.) have been removed
 """
 
@@ -226,3 +226,40 @@ class AuctionNotification(db.Model):
     
     def __repr__(self):
         return f'<AuctionNotification {self.notification_type} for {self.user_id}>'
+
+
+# ===== MARKET PRICE MODEL (MANDI PRICE HISTORY) =====
+
+class MarketPrice(db.Model):
+    """Daily mandi price of a commodity, synced from Data.gov.in (one row per commodity, market and day)"""
+    __tablename__ = "market_prices"
+    __table_args__ = (
+        # Upsert key of the price sync; also serves the latest prices of one market
+        db.UniqueConstraint('commodity_name', 'market_name', 'price_date', name='uq_market_prices_commodity_market_date'),
+        # Latest prices of a commodity across all markets
+        db.Index('ix_market_prices_commodity_date', 'commodity_name', db.desc('price_date')),
+    )
+    
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    
+    # Commodity & market
+    commodity_name = db.Column(db.String(100), nullable=False)
+    market_name = db.Column(db.String(255), nullable=False)
+    market_state = db.Column(db.String(100))
+    market_district = db.Column(db.String(100))
+    
+    # Prices (₹/quintal); the API reports min, max and modal prices, stored as low, high and close
+    open_price = db.Column(db.Float)
+    high_price = db.Column(db.Float)
+    low_price = db.Column(db.Float)
+    close_price = db.Column(db.Float)
+    trading_volume = db.Column(db.Float)
+    
+    price_date = db.Column(db.Date, nullable=False)
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<MarketPrice {self.commodity_name} @ {self.market_name} on {self.price_date}>'
@@ -0,0 +1,182 @@
+"""
+Shared TTL cache for upstream price data
+Entries live in a small SQLite file, so every gunicorn worker (and every
+restart) sees the same cache. Fresh entries are served as they are; stale
+ones are served immediately while a single background refresh runs
+(stale-while-revalidate), and a failed fetch falls back to the last value.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+
+# Entries younger than this are fresh (mandi prices change a few times a day)
+PRICE_CACHE_TTL = float(os.getenv('PRICE_CACHE_TTL', 30 * 60))
+# Past the TTL, entries are still served for this long while they are refreshed
+PRICE_CACHE_STALE = float(os.getenv('PRICE_CACHE_STALE', 6 * 60 * 60))
+PRICE_CACHE_PATH = os.getenv(
+    'PRICE_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'price_cache.sqlite3'),
+)
+# A claimed refresh is given up (and may be claimed again) after this long
+REFRESH_LEASE_SECONDS = 60
+
+
+class PriceCache:
+    """
+    SQLite-backed TTL cache with stale-while-revalidate.
+
+    get_or_fetch(key, fetch) returns the cached value or calls fetch();
+    fetch returns None when the upstream has nothing usable, and None is
+    never cached. Refreshes of stale entries are claimed with a lease in the
+    database, so only one worker refreshes a key at a time.
+    """
+
+    def __init__(self, path=PRICE_CACHE_PATH, ttl=PRICE_CACHE_TTL, stale=PRICE_CACHE_STALE):
+        self.path = path
+        self.ttl = ttl
+        self.stale = stale
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self.stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'refreshes': 0,
+                      'refresh_failures': 0, 'stale_on_error': 0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().execute(
+            'CREATE TABLE IF NOT EXISTS price_cache ('
+            ' key TEXT PRIMARY KEY,'
+            ' value TEXT NOT NULL,'
+            ' fetched_at REAL NOT NULL,'
+            ' refresh_lease REAL NOT NULL DEFAULT 0)'
+        )
+
+    def _connection(self):
+        """One connection per thread and process (connections must not cross a fork)."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    # ========== READ / WRITE ==========
+
+    def get(self, key):
+        """Return (value, age_seconds) or (None, None)."""
+        row = self._connection().execute(
+            'SELECT value, fetched_at FROM price_cache WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None, None
+        return json.loads(row[0]), time.time() - row[1]
+
+    def set(self, key, value):
+        self._connection().execute(
+            'INSERT INTO price_cache (key, value, fetched_at, refresh_lease) VALUES (?, ?, ?, 0) '
+            'ON CONFLICT(key) DO UPDATE SET value = excluded.value, fetched_at = excluded.fetched_at, '
+            'refresh_lease = 0',
+            (key, json.dumps(value), time.time()),
+        )
+
+    def _claim_refresh(self, key):
+        """Atomically take the refresh lease of a key (False if another worker holds it)."""
+        now = time.time()
+        cursor = self._connection().execute(
+            'UPDATE price_cache SET refresh_lease = ? WHERE key = ? AND refresh_lease < ?',
+            (now + REFRESH_LEASE_SECONDS, key, now),
+        )
+        return cursor.rowcount == 1
+
+    # ========== CACHING ==========
+
+    def get_cached(self, key, fetch):
+        """
+        Fresh or stale cached value for key, without waiting for the upstream:
+        stale values are refreshed with fetch in the background, and a miss
+        (or an expired value) returns None.
+        """
+        value, age = self.get(key)
+        if value is not None and age < self.ttl:
+            self._count('hits')
+            return value
+
+        if value is not None and age < self.ttl + self.stale:
+            self._count('stale_hits')
+            if self._claim_refresh(key):
+                threading.Thread(target=self._refresh, args=(key, fetch),
+                                 name='price-cache-refresh', daemon=True).start()
+            return value
+
+        return None
+
+    def get_or_fetch(self, key, fetch):
+        """
+        Cached value for key, fetching it on a miss.
+
+        Args:
+            key (str): Cache key
+            fetch (callable): Returns the value, or None if nothing could be fetched
+
+        Returns:
+            The cached or fetched value, or None
+        """
+        value = self.get_cached(key, fetch)
+        if value is not None:
+            return value
+
+        self._count('misses')
+        value, _ = self.get(key)
+        fresh = fetch()
+        if fresh is not None:
+            self.set(key, fresh)
+            return fresh
+        if value is not None:
+            # Upstream is down: an expired value beats no value
+            self._count('stale_on_error')
+        return value
+
+    def _refresh(self, key, fetch):
+        try:
+            fresh = fetch()
+        except Exception as e:
+            print(f"Price cache refresh failed for {key}: {e}")
+            fresh = None
+        if fresh is None:
+            self._count('refresh_failures')
+            return
+        self.set(key, fresh)
+        self._count('refreshes')
+
+    def get_stats(self):
+        """Hit/miss counters of this process plus the number of cached entries."""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        lookups = stats['hits'] + stats['stale_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['hits'] + stats['stale_hits']) / lookups, 4) if lookups else 0.0
+        stats['entries'] = self._connection().execute('SELECT COUNT(*) FROM price_cache').fetchone()[0]
+        stats['ttl_seconds'] = self.ttl
+        stats['stale_seconds'] = self.stale
+        return stats
+
+
+_price_cache = None
+_price_cache_lock = threading.Lock()
+
+
+def get_price_cache():
+    """The process-wide PriceCache (opened on first use)."""
+    global _price_cache
+    with _price_cache_lock:
+        if _price_cache is None:
+            _price_cache = PriceCache()
+        return _price_cache
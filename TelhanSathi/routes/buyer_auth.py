@@ -3,13 +3,17 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 import sys
 import os
+import uuid
 import requests
 
 # Avoid circular imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from models_marketplace_keep import Buyer, Chat, ChatMessage
+from sqlalchemy.dialects import postgresql, sqlite
+from models_marketplace_keep import Buyer, Chat, ChatMessage, MarketPrice
 from extensions import db
+from singleflight import upstream
+from circuit_breaker import data_gov_in, CircuitOpenError
 
 buyer_auth_bp = Blueprint('buyer_auth', __name__, url_prefix='/buyer')
 
@@ -387,93 +391,45 @@ def sync_market_prices():
     Fetches latest prices for oilseed commodities
     """
     try:
-        synced_count = 0
+        synced_count = 0  # Newly inserted prices
+        updated_count = 0  # Existing prices refreshed
         errors = []
         
         # Call Data.gov.in API for each commodity
         for commodity_key, commodity_api_name in OILSEED_COMMODITIES.items():
             try:
-                # Data.gov.in API endpoint
-                api_url = "https://api.data.gov.in/resource/5e4ff2f1-d728-49b5-b92e-12640c4e3ede"
+                # Concurrent syncs share one API call per commodity
+                data = upstream.do(f'market_prices:{commodity_api_name}',
+                                   fetch_market_price_records, commodity_api_name)
                 
-                params = {
-                    'api-key': API_KEY,
-                    'format': 'json',
-                    'filters[commodity_name]': commodity_api_name,
-                    'limit': 1000
-                }
-                
-                response = requests.get(api_url, params=params, timeout=10)
-                response.raise_for_status()
-                
-                data = response.json()
-                
-                if 'records' in data:
-                    for record in data['records']:
-                        try:
-                            # Extract data from API response
-                            commodity_name = record.get('commodity_name', commodity_key)
-                            market_name = record.get('market', '')
-                            market_state = record.get('state', '')
-                            market_district = record.get('district', '')
-                            
-                            # Parse prices
-                            open_price = float(record.get('arrival_date', 0)) if record.get('arrival_date') else None
-                            close_price = float(record.get('modal_price', 0)) if record.get('modal_price') else None
-                            high_price = float(record.get('max_price', 0)) if record.get('max_price') else None
-                            low_price = float(record.get('min_price', 0)) if record.get('min_price') else None
-                            
-                            # Price date
-                            price_date_str = record.get('arrival_date', '')
-                            try:
-                                price_date = datetime.strptime(price_date_str, '%d/%m/%Y').date()
-                            except:
-                                price_date = datetime.utcnow().date()
-                            
-                            # Check if record exists
-                            existing = MarketPrice.query.filter_by(
-                                commodity_name=commodity_name,
-                                market_name=market_name,
-                                price_date=price_date
-                            ).first()
-                            
-                            if existing:
-                                # Update existing record
-                                existing.open_price = open_price
-                                existing.close_price = close_price
-                                existing.high_price = high_price
-                                existing.low_price = low_price
-                                existing.updated_at = datetime.utcnow()
-                                db.session.add(existing)
-                            else:
-                                # Create new record
-                                new_price = MarketPrice(
-                                    commodity_name=commodity_name,
-                                    market_name=market_name,
-                                    market_state=market_state,
-                                    market_district=market_district,
-                                    open_price=open_price,
-                                    high_price=high_price,
-                                    low_price=low_price,
-                                    close_price=close_price,
-                                    price_date=price_date
-                                )
-                                db.session.add(new_price)
-                                synced_count += 1
-                        except Exception as e:
-                            errors.append(f"Error processing record: {str(e)}")
-                            continue
+                # One row per (commodity, market, date); a later record in the page wins
+                rows = {}
+                for record in data.get('records', []):
+                    try:
+                        row = parse_market_price_record(record, commodity_key)
+                        rows[(row['commodity_name'], row['market_name'], row['price_date'])] = row
+                    except Exception as e:
+                        errors.append(f"Error processing record: {str(e)}")
+                        continue
                 
+                # Insert or update the whole page in one statement
+                inserted, updated = upsert_market_prices(list(rows.values()))
+                synced_count += inserted
+                updated_count += updated
                 db.session.commit()
                 
+            except CircuitOpenError:
+                errors.append(f"API unavailable for {commodity_key}: data.gov.in circuit open")
             except requests.exceptions.RequestException as e:
                 errors.append(f"API error for {commodity_key}: {str(e)}")
             except Exception as e:
+                db.session.rollback()
                 errors.append(f"Processing error for {commodity_key}: {str(e)}")
         
         return jsonify({
             'success': True,
             'synced_count': synced_count,
+            'updated_count': updated_count,
             'errors': errors if errors else None
         }), 200
         
@@ -482,6 +438,88 @@ def sync_market_prices():
         return jsonify({'error': str(e)}), 500
 
 
+def fetch_market_price_records(commodity_api_name):
+    """Fetch one commodity's price records from the Data.gov.in API (raises RequestException)"""
+    # Data.gov.in API endpoint
+    api_url = "https://api.data.gov.in/resource/5e4ff2f1-d728-49b5-b92e-12640c4e3ede"
+    
+    params = {
+        'api-key': API_KEY,
+        'format': 'json',
+        'filters[commodity_name]': commodity_api_name,
+        'limit': 1000
+    }
+    
+    response = data_gov_in.call(requests.get, api_url, params=params, timeout=10)
+    response.raise_for_status()
+    
+    return response.json()
+
+
+def parse_market_price_record(record, commodity_key):
+    """Map one Data.gov.in price record to a market_prices row"""
+    # Price date
+    price_date_str = record.get('arrival_date', '')
+    try:
+        price_date = datetime.strptime(price_date_str, '%d/%m/%Y').date()
+    except:
+        price_date = datetime.utcnow().date()
+    
+    now = datetime.utcnow()
+    return {
+        'commodity_name': record.get('commodity_name', commodity_key),
+        'market_name': record.get('market', ''),
+        'market_state': record.get('state', ''),
+        'market_district': record.get('district', ''),
+        # The API has no opening price, only min/max/modal
+        'open_price': None,
+        'close_price': float(record.get('modal_price', 0)) if record.get('modal_price') else None,
+        'high_price': float(record.get('max_price', 0)) if record.get('max_price') else None,
+        'low_price': float(record.get('min_price', 0)) if record.get('min_price') else None,
+        'price_date': price_date,
+        'created_at': now,
+        'updated_at': now,
+    }
+
+
+def upsert_market_prices(rows):
+    """
+    Insert or update market price rows in a single INSERT ... ON CONFLICT
+    on (commodity_name, market_name, price_date)
+
+    Rows must not repeat a key (PostgreSQL rejects updating a row twice in
+    one statement). Returns (inserted, updated) row counts.
+    """
+    if not rows:
+        return 0, 0
+    
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        insert = postgresql.insert
+    elif dialect == 'sqlite':
+        insert = sqlite.insert
+    else:
+        raise RuntimeError(f"Market price upsert not supported on {dialect}")
+    
+    for row in rows:
+        row.setdefault('id', str(uuid.uuid4()))
+    
+    statement = insert(MarketPrice.__table__).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=['commodity_name', 'market_name', 'price_date'],
+        set_={
+            column: statement.excluded[column]
+            for column in ('market_state', 'market_district', 'open_price', 'high_price',
+                           'low_price', 'close_price', 'updated_at')
+        },
+    )
+    # Inserted rows keep created_at == updated_at; updates only move updated_at
+    statement = statement.returning(MarketPrice.created_at, MarketPrice.updated_at)
+    written = db.session.execute(statement).all()
+    inserted = sum(1 for created_at, updated_at in written if created_at == updated_at)
+    return inserted, len(written) - inserted
+
+
 @buyer_auth_bp.route('/api/prices/<commodity>', methods=['GET'])
 def get_commodity_prices(commodity):
     """
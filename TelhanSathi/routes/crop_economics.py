@@ -7,8 +7,15 @@ from flask import Blueprint, render_template, jsonify, session, request
 from functools import wraps
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
+from concurrent.futures import ThreadPoolExecutor, wait
+import os
+import time
+import threading
 import requests
 from extensions import db
+from price_cache import get_price_cache
+from singleflight import upstream
+from circuit_breaker import data_gov_in, CircuitOpenError
 
 crop_economics_bp = Blueprint('crop_economics', __name__, url_prefix='/crop-economics')
 
@@ -19,6 +26,15 @@ AGMARKNET_API_BASE = "https://agmarknet.gov.in/SearchCmmMkt.aspx"
 # Alternative: Using data.gov.in Mandi Price dataset
 GOVT_API_BASE = "https://api.data.gov.in/resource/9ef84268-d588-465a-a5c3-375cda092f58"
 
+# All oilseeds are fetched concurrently; a request waits at most this long
+# for the whole set and answers with whatever has arrived
+PRICE_FETCH_DEADLINE = float(os.getenv('PRICE_FETCH_DEADLINE', 8))
+# Upper bound on concurrent upstream calls (shared by all requests of a worker);
+# cached prices are served inline and never wait for a pool thread
+PRICE_FETCH_WORKERS = int(os.getenv('PRICE_FETCH_WORKERS', 10))
+# Per-call timeout; repeated timeouts open the data.gov.in circuit (circuit_breaker.py)
+GOVT_API_TIMEOUT = float(os.getenv('GOVT_API_TIMEOUT', 20))
+
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -50,6 +66,51 @@ def fetch_live_prices_from_api(commodity_name, market_filter=None):
     Fetch live prices from Government API or database
     Returns list of prices from different markets
     Can filter by market if provided
+    
+    Upstream records are cached per commodity (see price_cache.py); the
+    market filter is applied to the cached records, since the API request
+    is the same for every market. Concurrent cache misses for a commodity
+    share one upstream call (see singleflight.py).
+    """
+    key = f'govt_prices:{commodity_name}'
+    prices = get_price_cache().get_or_fetch(key, _upstream_fetch(commodity_name))
+    return _prices_for_market(commodity_name, prices, market_filter)
+
+
+def get_cached_live_prices(commodity_name, market_filter=None):
+    """
+    Prices for a commodity if they are in the price cache (fresh or stale),
+    else None. Never waits for the upstream.
+    """
+    key = f'govt_prices:{commodity_name}'
+    prices = get_price_cache().get_cached(key, _upstream_fetch(commodity_name))
+    if prices is None:
+        return None
+    return _prices_for_market(commodity_name, prices, market_filter)
+
+
+def _upstream_fetch(commodity_name):
+    """Cache fetch function for a commodity (concurrent calls share one upstream request)"""
+    key = f'govt_prices:{commodity_name}'
+    return lambda: upstream.do(key, fetch_prices_from_upstream, commodity_name)
+
+
+def _prices_for_market(commodity_name, prices, market_filter):
+    """Apply the market filter to cached records, falling back to mock data"""
+    if prices and market_filter:
+        prices = [p for p in prices if p['market'].lower() == market_filter.lower()]
+    if prices:
+        return prices
+    
+    # If no API data, return mock data for demonstration
+    print(f"Using mock data for {commodity_name}")
+    return get_mock_prices(commodity_name, market_filter=market_filter)
+
+
+def fetch_prices_from_upstream(commodity_name):
+    """
+    Call the Government API for one commodity (all markets).
+    Returns the parsed price records, or None if the API failed or had none.
     """
     try:
         # Try government API with longer timeout
@@ -61,8 +122,9 @@ def fetch_live_prices_from_api(commodity_name, market_filter=None):
             'sort': {'arrival_date': -1}  # Latest first
         }
         
-        # Increase timeout to 20 seconds for slower API responses
-        response = requests.get(GOVT_API_BASE, params=params, timeout=20)
+        # Goes through the circuit breaker: while data.gov.in keeps timing out
+        # this fails immediately and the cache or mock data is served instead
+        response = data_gov_in.call(requests.get, GOVT_API_BASE, params=params, timeout=GOVT_API_TIMEOUT)
         print(f"API Response Status for {commodity_name}: {response.status_code}")
         
         if response.status_code == 200:
@@ -83,10 +145,6 @@ def fetch_live_prices_from_api(commodity_name, market_filter=None):
                         
                         if price and float(price) > 0:
                             record_market = record.get('market', record.get('market_name', 'Unknown'))
-                            # Filter by market if provided
-                            if market_filter and record_market.lower() != market_filter.lower():
-                                continue
-                            
                             prices.append({
                                 'price': float(price),
                                 'market': record_market,
@@ -101,14 +159,82 @@ def fetch_live_prices_from_api(commodity_name, market_filter=None):
             if prices:
                 print(f"Prices parsed for {commodity_name}: {len(prices)} valid entries")
                 return prices
+    except CircuitOpenError:
+        print(f"data.gov.in circuit open - skipping API call for {commodity_name}")
     except requests.exceptions.Timeout:
         print(f"API Timeout for {commodity_name} - switching to mock data")
     except requests.exceptions.RequestException as e:
         print(f"API Error fetching prices for {commodity_name}: {str(e)}")
     
-    # If no API data, return mock data for demonstration
-    print(f"Using mock data for {commodity_name}")
-    return get_mock_prices(commodity_name, market_filter=market_filter)
+    return None
+
+
+_fetch_pool = None
+_fetch_pool_lock = threading.Lock()
+
+
+def _get_fetch_pool():
+    """Thread pool for upstream price calls (created on first use, so never in a preforking master)."""
+    global _fetch_pool
+    with _fetch_pool_lock:
+        if _fetch_pool is None:
+            _fetch_pool = ThreadPoolExecutor(max_workers=PRICE_FETCH_WORKERS, thread_name_prefix='price-fetch')
+        return _fetch_pool
+
+
+def fetch_oilseed_prices(market_filter=None, deadline=None):
+    """
+    Fetch prices for every commodity in OILSEEDS concurrently under one
+    overall deadline. Commodities in the price cache are answered inline;
+    only cache misses are queued on the shared fetch pool, so upstream calls
+    of other requests can never make a cached commodity miss the deadline.
+
+    Returns:
+        tuple: ({crop_key: prices} for the commodities that finished in time,
+            [crop_key, ...] that missed the deadline, in OILSEEDS order)
+    """
+    if deadline is None:
+        deadline = PRICE_FETCH_DEADLINE
+
+    started = time.monotonic()
+    cached = {}
+    futures = {}
+    for crop_key, crop_info in OILSEEDS.items():
+        prices = get_cached_live_prices(crop_info['api_name'], market_filter)
+        if prices is not None:
+            cached[crop_key] = prices
+        else:
+            futures[crop_key] = _get_fetch_pool().submit(
+                fetch_live_prices_from_api, crop_info['api_name'], market_filter
+            )
+    done, _ = wait(futures.values(), timeout=max(0.0, deadline - (time.monotonic() - started)))
+
+    results = {}
+    missed = []
+    for crop_key in OILSEEDS:
+        if crop_key in cached:
+            results[crop_key] = cached[crop_key]
+            continue
+        future = futures[crop_key]
+        if future not in done:
+            # Late calls finish in the background; queued ones are dropped
+            future.cancel()
+            missed.append(crop_key)
+        elif future.exception() is not None:
+            print(f"Price fetch failed for {crop_key}: {future.exception()}")
+            results[crop_key] = []
+        else:
+            results[crop_key] = future.result()
+    if missed:
+        print(f"Price fetch deadline ({deadline}s) missed for: {', '.join(missed)}")
+    return results, missed
+
+
+def _mark_missed(response, missed):
+    """List commodities that missed the fetch deadline in a response header."""
+    if missed:
+        response.headers['X-Missed-Deadline'] = ','.join(missed)
+    return response
 
 
 def get_mock_prices(commodity_name, market_filter=None):
@@ -186,10 +312,13 @@ def get_prices():
     """
     market_filter = request.args.get('market', None)
     prices = {}
+    fetched, missed = fetch_oilseed_prices(market_filter=market_filter)
     
     for crop_key, crop_info in OILSEEDS.items():
-        # Fetch from government API with market filter
-        api_prices = fetch_live_prices_from_api(crop_info['api_name'], market_filter=market_filter)
+        if crop_key in missed:
+            prices[crop_key] = get_empty_price(crop_info, missed_deadline=True)
+            continue
+        api_prices = fetched[crop_key]
         
         if api_prices:
             # Calculate statistics
@@ -218,12 +347,12 @@ def get_prices():
         else:
             prices[crop_key] = get_empty_price(crop_info)
     
-    return jsonify(prices)
+    return _mark_missed(jsonify(prices), missed)
 
 
 
-def get_empty_price(crop_info):
-    """Return empty price structure when no data available"""
+def get_empty_price(crop_info, missed_deadline=False):
+    """Return empty price structure when no data available (or the fetch missed the deadline)"""
     return {
         'crop_name': crop_info['name'],
         'average': 0,
@@ -232,9 +361,10 @@ def get_empty_price(crop_info):
         'count': 0,
         'unit': crop_info['unit'],
         'icon': crop_info['icon'],
-        'trend': 'no_data',
+        'trend': 'timeout' if missed_deadline else 'no_data',
         'source': 'Government API',
-        'markets': []
+        'markets': [],
+        'missed_deadline': missed_deadline
     }
 
 def get_mock_price_history(crop_key, days=180):
@@ -324,6 +454,17 @@ def debug_api():
         return jsonify({'error': str(e)}), 500
 
 
+@crop_economics_bp.route('/api/metrics', methods=['GET'])
+@login_required
+def get_metrics():
+    """Upstream price cache, request coalescing and circuit breaker metrics (per worker process)"""
+    return jsonify({
+        'price_cache': get_price_cache().get_stats(),
+        'single_flight': upstream.get_stats(),
+        'circuit_breaker': data_gov_in.get_stats()
+    })
+
+
 @crop_economics_bp.route('/api/comparison', methods=['GET'])
 @login_required
 def get_comparison():
@@ -333,9 +474,19 @@ def get_comparison():
     """
     market_filter = request.args.get('market', None)
     comparison = []
+    fetched, missed = fetch_oilseed_prices(market_filter=market_filter)
     
     for crop_key, crop_info in OILSEEDS.items():
-        api_prices = fetch_live_prices_from_api(crop_info['api_name'], market_filter=market_filter)
+        if crop_key in missed:
+            comparison.append({
+                'crop': crop_info['name'],
+                'price': 0,
+                'icon': crop_info['icon'],
+                'count': 0,
+                'missed_deadline': True
+            })
+            continue
+        api_prices = fetched[crop_key]
         
         if api_prices:
             price_values = [p['price'] for p in api_prices if p['price'] > 0]
@@ -348,7 +499,7 @@ def get_comparison():
                     'count': len(api_prices)
                 })
     
-    return jsonify(comparison)
+    return _mark_missed(jsonify(comparison), missed)
 
 @crop_economics_bp.route('/api/top-crops', methods=['GET'])
 @login_required
@@ -359,9 +510,11 @@ def get_top_crops():
     """
     market_filter = request.args.get('market', None)
     crop_data = []
+    fetched, missed = fetch_oilseed_prices(market_filter=market_filter)
     
     for crop_key, crop_info in OILSEEDS.items():
-        api_prices = fetch_live_prices_from_api(crop_info['api_name'], market_filter=market_filter)
+        # Commodities that missed the deadline are only listed in X-Missed-Deadline
+        api_prices = fetched.get(crop_key)
         
         if api_prices:
             price_values = [p['price'] for p in api_prices if p['price'] > 0]
@@ -377,7 +530,7 @@ def get_top_crops():
     # Sort by number of markets/listings and return top 5
     top_crops = sorted(crop_data, key=lambda x: x['listings'], reverse=True)[:5]
     
-    return jsonify(top_crops)
+    return _mark_missed(jsonify(top_crops), missed)
 
 @crop_economics_bp.route('/api/market-details/<crop>', methods=['GET'])
 @login_required
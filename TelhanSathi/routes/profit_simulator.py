@@ -1,7 +1,13 @@
-from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for
+from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for, make_response
 from extensions import db
 from models import Farmer
-from datetime import datetime
+from datetime import datetime, timedelta
+from collections import OrderedDict
+from functools import wraps
+import base64
+import hashlib
+import json
+import threading
 import sys
 import os
 
@@ -10,20 +16,275 @@ profit_bp = Blueprint('profit', __name__, url_prefix='/profit')
 # Import the ML profit simulator based on ARIMA
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-try:
-    from ml.profit_simulator_arima import get_profit_simulator
-    simulator = get_profit_simulator()
-    ML_AVAILABLE = simulator.model_available
-    logger_msg = "[OK] ARIMA Profit Simulator loaded successfully"
-except Exception as e:
-    print(f"[WARNING] Profit Simulator not available - {str(e)}")
-    print("   ML models may not be trained")
-    ML_AVAILABLE = False
-    simulator = None
-    logger_msg = f"Profit Simulator Error: {str(e)}"
+# The simulator is built in a background thread once the app is up, so
+# importing this module (and serving /auth/login) never waits on ML imports,
+# model loading or training. /profit/api/* answers 503 until it is ready.
+simulator = None
+ML_AVAILABLE = False
 
-print(logger_msg)
+ML_STATE = {
+    'status': 'pending',   # pending -> loading -> ready | failed
+    'stage': None,
+    'progress': 0.0,
+    'error': None,
+    'started_at': None,
+    'ready_at': None,
+}
+_ml_lock = threading.Lock()
+_ml_thread = None
 
+# Preload mode (set by gunicorn.conf.py): the models are loaded synchronously
+# when the blueprint is registered, i.e. once in the gunicorn master, and the
+# forked workers share those pages copy-on-write
+ML_PRELOAD = os.getenv('ML_PRELOAD', '').lower() in ('1', 'true', 'yes')
+
+
+def _set_ml_state(**changes):
+    with _ml_lock:
+        ML_STATE.update(changes)
+
+
+def _warm_up_ml(preload=False):
+    """
+    Import the ML stack, build the simulator and preload the hottest models.
+    With preload=True every model is loaded with read-only arrays and the
+    hot-reload watcher is left to the workers (see after_fork).
+    """
+    global simulator, ML_AVAILABLE
+
+    _set_ml_state(status='loading', stage='importing', progress=0.05,
+                  started_at=datetime.utcnow().isoformat())
+    try:
+        from ml.profit_simulator_arima import get_profit_simulator
+
+        _set_ml_state(stage='loading_models', progress=0.3)
+        new_simulator = get_profit_simulator()
+        if not new_simulator.model_available:
+            raise RuntimeError('ARIMA models not available')
+
+        # Warm the model store (up to its LRU capacity) unless forecasts are precomputed
+        forecaster = new_simulator.forecaster
+        if preload:
+            _set_ml_state(stage='preloading models', progress=0.6)
+            forecaster.models.preload_all(read_only=True)
+        elif forecaster.forecast_tensor is None:
+            model_keys = forecaster.models.keys()[:forecaster.models.max_models]
+            for i, model_key in enumerate(model_keys, 1):
+                _set_ml_state(stage=f'warming {model_key}', progress=0.3 + 0.7 * (i - 1) / len(model_keys))
+                forecaster.models.get(model_key)
+
+        # Pick up newly published model versions without a restart
+        if not preload:
+            forecaster.start_hot_reload(on_reload=new_simulator.refresh_catalog)
+
+        simulator = new_simulator
+        ML_AVAILABLE = True
+        _set_ml_state(status='ready', stage=None, progress=1.0, ready_at=datetime.utcnow().isoformat())
+        print("[OK] ARIMA Profit Simulator loaded successfully")
+    except Exception as e:
+        print(f"[WARNING] Profit Simulator not available - {str(e)}")
+        print("   ML models may not be trained")
+        _set_ml_state(status='failed', stage=None, error=str(e))
+
+
+def start_ml_warmup():
+    """Start background ML initialisation (no-op if it is running or done)."""
+    global _ml_thread
+    with _ml_lock:
+        if ML_STATE['status'] == 'ready' or (_ml_thread is not None and _ml_thread.is_alive()):
+            return
+        _ml_thread = threading.Thread(target=_warm_up_ml, name='ml-warmup', daemon=True)
+        _ml_thread.start()
+
+
+def preload_ml():
+    """Load the ML stack synchronously in this process (before workers are forked)."""
+    if ML_STATE['status'] != 'ready':
+        _warm_up_ml(preload=True)
+
+
+def after_fork():
+    """
+    Restart the background threads in a freshly forked worker (threads do
+    not survive fork): the hot-reload watcher, or the warm-up itself if the
+    preload failed.
+    """
+    global _ml_lock, _ml_thread
+    _ml_lock = threading.Lock()
+    _ml_thread = None
+    if ML_STATE['status'] == 'ready' and simulator is not None:
+        simulator.forecaster.start_hot_reload(on_reload=simulator.refresh_catalog)
+    else:
+        start_ml_warmup()
+
+
+@profit_bp.record_once
+def _start_ml_on_register(state):
+    if ML_PRELOAD:
+        preload_ml()
+    else:
+        start_ml_warmup()
+
+
+@profit_bp.before_request
+def require_ml_ready():
+    """Fail fast with progress information while the models are warming up."""
+    if not request.path.startswith('/profit/api/') or request.endpoint == 'profit.api_ready':
+        return None
+    if 'farmer_id_verified' not in session or ML_STATE['status'] == 'ready':
+        return None
+
+    with _ml_lock:
+        state = dict(ML_STATE)
+    if state['status'] == 'failed':
+        return jsonify({
+            'error': 'ML मॉडल उपलब्ध नहीं है',
+            'details': state['error'],
+            'status': 'failed',
+        }), 503
+
+    response = jsonify({
+        'error': 'ML मॉडल लोड हो रहे हैं',
+        'details': 'कृपया कुछ सेकंड बाद पुनः प्रयास करें',
+        'status': 'warming_up',
+        'stage': state['stage'],
+        'progress': round(state['progress'], 2),
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = '2'
+    return response
+
+
+@profit_bp.route('/api/ready')
+def api_ready():
+    """Readiness probe: ML initialisation state and which models are in memory."""
+    with _ml_lock:
+        state = dict(ML_STATE)
+
+    body = {
+        'ready': state['status'] == 'ready',
+        'status': state['status'],
+        'stage': state['stage'],
+        'progress': round(state['progress'], 2),
+        'error': state['error'],
+        'started_at': state['started_at'],
+        'ready_at': state['ready_at'],
+    }
+    if simulator is not None:
+        forecaster = simulator.forecaster
+        body['models'] = {
+            'available': forecaster.models.keys(),
+            'loaded': [model_key for model_key, _ in forecaster.models.loaded_items()],
+            'cache': forecaster.get_model_cache_stats(),
+            'forecast_tensor': forecaster.forecast_tensor is not None,
+            'version': forecaster.model_version,
+        }
+        with _response_cache_lock:
+            body['response_cache'] = dict(RESPONSE_CACHE_STATS, size=len(_response_cache))
+    return jsonify(body), 200 if body['ready'] else 503
+
+
+# ========== RESPONSE CACHING ==========
+# Forecast responses only change when models are retrained or new data
+# arrives, so they are keyed on the forecaster's model_version plus the
+# request body: repeated requests get 304 (If-None-Match) or a stored body
+# instead of a recomputation.
+
+RESPONSE_CACHE_SIZE = int(os.getenv('PROFIT_RESPONSE_CACHE_SIZE', 512))
+# UTC hour of the daily retrain / data refresh; browsers may reuse results until then
+RETRAIN_HOUR_UTC = int(os.getenv('ARIMA_RETRAIN_HOUR_UTC', 2))
+
+_response_cache = OrderedDict()  # ETag -> JSON body (LRU)
+_response_cache_lock = threading.Lock()
+RESPONSE_CACHE_STATS = {'hits': 0, 'misses': 0, 'not_modified': 0}
+
+
+def _is_cacheable(payload):
+    """Only JSON objects with a deterministic result (no unseeded Monte Carlo) are cached."""
+    if not isinstance(payload, dict):
+        return False
+    # Same parsing as api_simulate, so cacheability matches what the view does
+    return not (parse_flag(payload.get('monte_carlo', False)) and payload.get('seed') is None)
+
+
+def _forecast_etag(endpoint, payload):
+    """
+    ETag for an endpoint's response to `payload` under the current models.
+    The body is only canonicalised (key order, whitespace): values are hashed
+    as sent, so inputs the view parses differently never share a tag.
+    """
+    body = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    digest = hashlib.sha1(f"{endpoint}|{body}".encode()).hexdigest()[:16]
+    return f"{simulator.forecaster.model_version}-{digest}"
+
+
+def _seconds_until_retrain(now=None):
+    """Seconds until the next daily retrain at RETRAIN_HOUR_UTC."""
+    now = now or datetime.utcnow()
+    next_retrain = now.replace(hour=RETRAIN_HOUR_UTC, minute=0, second=0, microsecond=0)
+    if next_retrain <= now:
+        next_retrain += timedelta(days=1)
+    return int((next_retrain - now).total_seconds())
+
+
+def _cache_headers(response, etag):
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = f'private, max-age={_seconds_until_retrain()}'
+    response.headers['X-Model-Version'] = simulator.forecaster.model_version
+    return response
+
+
+def forecast_cache(view):
+    """
+    HTTP caching for forecast endpoints (POST with a JSON body).
+    Successful responses carry an ETag and Cache-Control; a matching
+    If-None-Match is answered with 304 and no recomputation. Error
+    responses and random (unseeded Monte Carlo) results are neither stored
+    nor tagged.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if 'farmer_id_verified' not in session or not ML_AVAILABLE or not simulator:
+            return view(*args, **kwargs)
+
+        payload = request.get_json(silent=True)
+        if payload is None and not request.get_data():
+            payload = {}
+        if not _is_cacheable(payload):
+            return view(*args, **kwargs)
+
+        etag = _forecast_etag(request.endpoint, payload)
+        if etag in request.if_none_match:
+            with _response_cache_lock:
+                RESPONSE_CACHE_STATS['not_modified'] += 1
+            return _cache_headers(make_response('', 304), etag)
+
+        with _response_cache_lock:
+            body = _response_cache.get(etag)
+            if body is not None:
+                _response_cache.move_to_end(etag)
+                RESPONSE_CACHE_STATS['hits'] += 1
+            else:
+                RESPONSE_CACHE_STATS['misses'] += 1
+        if body is not None:
+            response = make_response(body)
+            response.mimetype = 'application/json'
+            return _cache_headers(response, etag)
+
+        response = make_response(view(*args, **kwargs))
+        if response.status_code != 200 or (response.get_json(silent=True) or {}).get('status') == 'error':
+            return response
+        with _response_cache_lock:
+            _response_cache[etag] = response.get_data()
+            while len(_response_cache) > RESPONSE_CACHE_SIZE:
+                _response_cache.popitem(last=False)
+        return _cache_headers(response, etag)
+    return wrapper
+
+
+def parse_flag(value):
+    """Strict boolean of a JSON flag: true, 1 or "1"/"true"/"yes" (so "false" and "0" stay off)."""
+    return value is True or str(value).strip().lower() in ('1', 'true', 'yes')
 
 
 def get_market_price(crop_name):
@@ -57,9 +318,10 @@ def api_init():
     if not farmer:
         return jsonify({'error': 'Farmer not found'}), 404
 
-    # Get available markets and commodities from simulator
-    available_markets = simulator.get_available_markets() if ML_AVAILABLE and simulator else []
-    available_commodities = simulator.get_available_commodities() if ML_AVAILABLE and simulator else []
+    # Get available markets and commodities from the simulator's catalog
+    catalog = simulator.catalog if ML_AVAILABLE and simulator else None
+    available_markets = list(catalog.markets) if catalog else []
+    available_commodities = list(catalog.commodities) if catalog else []
 
     # Get current crop or default to Mustard
     current_crop = farmer.current_crops.split(',')[0] if farmer.current_crops else 'Mustard'
@@ -71,7 +333,7 @@ def api_init():
     
     # Extract state from farmer if available - find matching market
     market = farmer.district or (available_markets[0] if available_markets else 'Delhi')
-    if market not in available_markets:
+    if not (catalog and catalog.has_market(market)):
         market = available_markets[0] if available_markets else 'Delhi'
     
     harvest_month = farmer.harvest_date.strftime('%B') if farmer.harvest_date else 'October'
@@ -100,6 +362,7 @@ def api_init():
 
 
 @profit_bp.route('/api/simulate', methods=['POST'])
+@forecast_cache
 def api_simulate():
     """
     Calculate profit using ARIMA-based price forecasts.
@@ -121,6 +384,11 @@ def api_simulate():
         area_in_acres = float(data.get('area_in_acres', 1.0))
         harvest_month = data.get('harvest_month', 'October')
         custom_cost_per_acre = data.get('custom_cost_per_acre', None)
+        monte_carlo = parse_flag(data.get('monte_carlo', False))
+        n_paths = int(data['paths']) if data.get('paths') is not None else None
+        yield_cv = float(data.get('yield_cv', 0.0))
+        cost_cv = float(data.get('cost_cv', 0.0))
+        seed = int(data['seed']) if data.get('seed') is not None else None
         
         # Convert custom cost to float if provided
         if custom_cost_per_acre is not None:
@@ -134,7 +402,12 @@ def api_simulate():
             market=market,
             commodity=commodity,
             area_acres=area_in_acres,
-            custom_cost_per_acre=custom_cost_per_acre
+            custom_cost_per_acre=custom_cost_per_acre,
+            monte_carlo=monte_carlo,
+            n_paths=n_paths,
+            yield_cv=yield_cv,
+            cost_cv=cost_cv,
+            seed=seed
         )
         
         if result['status'] == 'error':
@@ -157,10 +430,14 @@ def api_simulate():
             'price_min': result['price']['minimum'],
             'price_max': result['price']['maximum'],
             'price_trend': result['price']['trend'],
-            'model_used': 'ARIMA',
+            'model_used': result['model_info']['model_type'],
             'forecast_months': result['forecast_period_days'],
         }
         
+        # Profit distribution (only when requested with monte_carlo=true)
+        if 'monte_carlo' in result:
+            prediction['risk'] = result['monte_carlo']
+        
         return jsonify({
             'crop_name': commodity,
             'market': market,
@@ -190,6 +467,7 @@ def api_simulate():
 # ========== COMMODITY COMPARISON ROUTE ==========
 
 @profit_bp.route('/api/compare-commodities', methods=['POST'])
+@forecast_cache
 def api_compare_commodities():
     """Compare profit potential across commodities in a market."""
     if 'farmer_id_verified' not in session:
@@ -207,3 +485,138 @@ def api_compare_commodities():
         return jsonify(result)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+
+@profit_bp.route('/api/optimize', methods=['POST'])
+@forecast_cache
+def api_optimize():
+    """
+    Split the farmer's land across oilseeds for the best risk-adjusted profit.
+    Body: {"market": "Delhi", "total_acres": 5, "constraints": {"risk_aversion": 1.0,
+           "max_share": 0.6, "min_acres": {...}, "max_acres": {...}, "exclude": [...]}}
+    """
+    if 'farmer_id_verified' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    if not ML_AVAILABLE or not simulator:
+        return jsonify({'error': 'ML models not available'}), 503
+
+    data = request.json or {}
+
+    try:
+        market = data.get('market', 'Delhi')
+        total_acres = float(data.get('total_acres', data.get('area_in_acres', 1.0)))
+        constraints = data.get('constraints') or {}
+        if not isinstance(constraints, dict):
+            raise ValueError('constraints must be an object')
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': 'अमान्य इनपुट', 'details': str(e)}), 400
+
+    result = simulator.optimize_allocation(market, total_acres, constraints)
+    if result['status'] == 'error':
+        return jsonify({'error': 'अनुकूलन विफल', 'details': result['message']}), 400
+    return jsonify(result)
+
+
+@profit_bp.route('/api/sensitivity', methods=['POST'])
+@forecast_cache
+def api_sensitivity():
+    """
+    What-if profit/ROI grid for one market and commodity.
+    Body: {"market": "Delhi", "commodity": "Soybean",
+           "area_acres": {"min": 1, "max": 10, "steps": 10},
+           "custom_cost_per_acre": [15000, 20000, 25000],
+           "custom_yield_quintals": {"min": 10, "max": 25, "steps": 16}}
+    Each input is a number, a list of values or a {min, max, steps} range;
+    grids are indexed [area][cost][yield].
+    """
+    if 'farmer_id_verified' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    if not ML_AVAILABLE or not simulator:
+        return jsonify({'error': 'ML models not available'}), 503
+
+    data = request.json or {}
+
+    result = simulator.sensitivity_surface(
+        market=data.get('market', 'Delhi'),
+        commodity=data.get('commodity', 'Soybean'),
+        area_acres=data.get('area_acres', data.get('area_in_acres')),
+        cost_per_acre=data.get('custom_cost_per_acre'),
+        yield_quintals=data.get('custom_yield_quintals'),
+    )
+    if result['status'] == 'error':
+        return jsonify({'error': 'अमान्य इनपुट', 'details': result['message']}), 400
+    return jsonify(result)
+
+
+# ========== BATCH FORECAST ROUTE ==========
+
+MAX_BATCH_KEYS = 100
+MAX_BATCH_PERIODS = 365
+
+
+@profit_bp.route('/api/forecast-batch', methods=['POST'])
+def api_forecast_batch():
+    """
+    Forecast many (market, commodity) pairs in one call.
+    Body: {"keys": [["Delhi", "Soybean"], ...], "periods": 30, "encoding": "json" | "base64"}
+    Omitting "keys" forecasts every available pair.
+    Arrays are columnar (one row per key); with "base64" each array is
+    packed little-endian float32 in row-major order.
+    """
+    if 'farmer_id_verified' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    if not ML_AVAILABLE or not simulator:
+        return jsonify({'error': 'ML models not available'}), 503
+
+    data = request.json or {}
+
+    try:
+        periods = int(data.get('periods', 30))
+        encoding = data.get('encoding', 'json')
+        keys = data.get('keys')
+        if keys is None:
+            forecaster = simulator.forecaster
+            keys = [(market, commodity)
+                    for market in forecaster.get_unique_markets()
+                    for commodity in forecaster.get_commodities_for_market(market)]
+        else:
+            keys = [
+                (key['market'], key['commodity']) if isinstance(key, dict) else (key[0], key[1])
+                for key in keys
+            ]
+    except (ValueError, TypeError, KeyError, IndexError) as e:
+        return jsonify({'error': 'Invalid input', 'details': str(e)}), 400
+
+    if not 1 <= periods <= MAX_BATCH_PERIODS:
+        return jsonify({'error': f'periods must be between 1 and {MAX_BATCH_PERIODS}'}), 400
+    if len(keys) > MAX_BATCH_KEYS:
+        return jsonify({'error': f'At most {MAX_BATCH_KEYS} keys per request'}), 400
+    if encoding not in ('json', 'base64'):
+        return jsonify({'error': "encoding must be 'json' or 'base64'"}), 400
+
+    try:
+        batch = simulator.forecaster.forecast_many(keys, periods=periods)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    response = {
+        'keys': [list(key) for key in batch['keys']],
+        'missing': [list(key) for key in batch['missing']],
+        'periods': periods,
+        'shape': [len(batch['keys']), periods],
+        'encoding': encoding,
+        'last_price': [round(float(p), 2) for p in batch['last_price']],
+    }
+    for field in ('forecast', 'lower_ci', 'upper_ci'):
+        if encoding == 'base64':
+            packed = batch[field].astype('<f4').tobytes()
+            response[field] = base64.b64encode(packed).decode('ascii')
+        else:
+            response[field] = batch[field].round(2).tolist()
+    if encoding == 'base64':
+        response['dtype'] = 'float32'
+
+    return jsonify(response)
@@ -0,0 +1,73 @@
+"""
+Single-flight request coalescing for outbound API calls
+Concurrent calls with the same key share one in-flight execution and its
+result (or exception), so a burst of identical requests costs the upstream
+one call instead of one per caller
+"""
+
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Group of keyed calls, one in flight per key (per process).
+
+    Only calls that overlap are merged; nothing is cached once a call has
+    returned (see price_cache.py for that).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = {'executed': 0, 'coalesced': 0}
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) unless a call with the same key is already
+        running, in which case wait for it and return its result.
+
+        Raises:
+            Whatever the shared call raised, in every waiting caller
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.stats['coalesced'] += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.stats['executed'] += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+        else:
+            try:
+                call.result = fn(*args, **kwargs)
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, in_flight=len(self._calls))
+
+
+# Shared by the routes that call data.gov.in
+upstream = SingleFlight()